@@ -0,0 +1,65 @@
+"""Benchmark the NumPy point-in-polygon engine against matplotlib.
+
+Run from the repository root:
+
+    python -m benchmarks.point_in_polygon --points 20000000
+
+Points are drawn uniformly over the TEMPO North America domain and tested
+against the California polygon used by the ETL jobs. matplotlib is only
+needed to run the comparison, not by the ETL code itself.
+"""
+import argparse
+import time
+
+import numpy as np
+from matplotlib.path import Path as PolygonPath
+
+from src.services.geometry import points_in_polygon
+
+CALIFORNIA = [
+    (-120.0091050, 41.9727325),
+    (-124.6045661, 41.8898826),
+    (-120.4462801, 33.9044735),
+    (-117.1073262, 32.6184122),
+    (-114.2955756, 32.6554188),
+    (-114.1637748, 34.3047333),
+    (-114.7349117, 35.0995465),
+    (-120.0948112, 39.0254518),
+    (-120.0091050, 41.9727325),
+]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=20_000_000)
+    parser.add_argument("--chunk-size", type=int, default=262_144)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lon = rng.uniform(-170.0, -10.0, args.points)
+    lat = rng.uniform(10.0, 80.0, args.points)
+
+    numpy_mask, numpy_s = _timed(
+        lambda: points_in_polygon(lon, lat, CALIFORNIA, chunk_size=args.chunk_size)
+    )
+    mpl_mask, mpl_s = _timed(
+        lambda: PolygonPath(CALIFORNIA).contains_points(np.column_stack([lon, lat]))
+    )
+
+    mismatches = int(np.count_nonzero(numpy_mask != mpl_mask))
+    print(f"points:      {args.points:,} ({int(numpy_mask.sum()):,} inside)")
+    print(f"numpy:       {numpy_s:8.3f} s")
+    print(f"matplotlib:  {mpl_s:8.3f} s")
+    print(f"speed-up:    {mpl_s / numpy_s:8.2f}x")
+    print(f"mismatches:  {mismatches:,}")
+
+
+if __name__ == "__main__":
+    main()
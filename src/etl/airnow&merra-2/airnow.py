@@ -6,15 +6,25 @@ y los carga en BigQuery, igual que el script MERRA-2.
 """
 
 import os
+import sys
 import datetime as dt
 import logging
 import time
+from pathlib import Path
 import requests
 import pandas as pd
-from matplotlib.path import Path as PolygonPath
 from google.cloud import bigquery
 from dotenv import load_dotenv, find_dotenv
 
+# Permite ejecutar el script directamente (python "src/etl/airnow&merra-2/airnow.py"):
+# los módulos compartidos se importan como `src.*` desde la raíz del repositorio.
+_REPO_ROOT = str(Path(__file__).resolve().parents[3])
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from src.etl.utils import KeyDeduplicator
+from src.services.geometry import points_in_polygon
+
 load_dotenv(find_dotenv())
 
 # ---------------------------------------------
@@ -50,7 +60,6 @@ polygon_coords = [
     (-120.0948112, 39.0254518),
     (-120.0091050, 41.9727325),
 ]
-poly_path = PolygonPath(polygon_coords)
 BBOX = "-124.6046,32.6184,-114.1637,41.9727"
 
 # ---------------------------------------------
@@ -105,38 +114,79 @@ def fetch_day(t0, t1):
             df["DateObserved"].astype(str) + " " + df["HourObserved"].astype(str) + ":00",
             errors="coerce"
         )
-        try:
-            df["time_utc"] = (
-                df["datetime_local"]
-                .dt.tz_localize("America/Los_Angeles", ambiguous="infer", nonexistent="shift_forward")
-                .dt.tz_convert("UTC")
-                .dt.tz_localize(None)
-            )
-        except Exception:
-            df["time_utc"] = pd.NaT
+        df["time_utc"] = local_to_utc(df)
 
     if {"Latitude", "Longitude"}.issubset(df.columns):
-        df["inside_poly"] = poly_path.contains_points(df[["Longitude", "Latitude"]].to_numpy())
+        df["inside_poly"] = points_in_polygon(
+            df["Longitude"].to_numpy(), df["Latitude"].to_numpy(), polygon_coords
+        )
         df = df[df["inside_poly"]].copy()
         df.rename(columns={"Latitude": "latitude", "Longitude": "longitude"}, inplace=True)
 
     df["source"] = "AirNow API"
     return df
 
+def site_columns(df):
+    """Columnas que identifican una estación."""
+    site = next((c for c in ("FullAQSCode", "IntlAQSCode", "AQSCode") if c in df.columns), None)
+    if site:
+        return [site]
+    # Sin código AQS, la estación se identifica por sus coordenadas
+    return [c for c in ("latitude", "longitude", "Latitude", "Longitude") if c in df.columns][:2]
+
+def local_to_utc(df, tz="America/Los_Angeles"):
+    """
+    Convierte `datetime_local` a UTC (naive), estación por estación.
+
+    `ambiguous="infer"` necesita las horas de una misma estación en orden,
+    así que se ordena cada estación antes de localizar. Si aun así no se
+    puede inferir (p. ej. falta una de las dos horas repetidas del cambio de
+    horario), solo las horas ambiguas de esa estación quedan en NaT, no el
+    día completo.
+    """
+    local = df["datetime_local"]
+    utc = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    sites = site_columns(df)
+    groups = df.groupby(sites, sort=False, dropna=False).groups if sites else {None: df.index}
+    for idx in groups.values():
+        times = local.loc[idx].sort_values(kind="stable")
+        try:
+            aware = times.dt.tz_localize(tz, ambiguous="infer", nonexistent="shift_forward")
+        except Exception:
+            aware = times.dt.tz_localize(tz, ambiguous="NaT", nonexistent="shift_forward")
+        utc.loc[times.index] = aware.dt.tz_convert("UTC").dt.tz_localize(None)
+    return utc
+
+def natural_key(df):
+    """
+    Llave natural de una medición: (hora UTC, estación, parámetro).
+
+    La hora local observada también forma parte de la llave, para que las
+    filas cuya hora UTC no se pudo determinar (NaT) no se colapsen entre sí.
+    """
+    time_col = "time_utc" if "time_utc" in df.columns else "UTC"
+    local_cols = ["datetime_local"] if "datetime_local" in df.columns else []
+    return [time_col, *local_cols, *site_columns(df), "Parameter"]
+
 def fetch_year(start_date, end_date):
     """Descarga datos día por día para todo un año."""
     cur = start_date
     frames = []
+    dedup = None
     while cur <= end_date:
         t0, t1 = iso_for_day(cur)
         logger.info(f"Descargando {t0} → {t1}")
         df = fetch_day(t0, t1)
         if not df.empty:
-            frames.append(df)
+            # Dedup por llave natural, día por día
+            dedup = dedup or KeyDeduplicator(natural_key(df))
+            frames.append(dedup(df))
         else:
             logger.warning(f"⚠️ Día vacío: {t0}")
         cur += dt.timedelta(days=1)
         time.sleep(0.3)
+    if dedup is not None:
+        logger.info(f"Duplicados eliminados: {dedup.removed:,} de {dedup.rows:,} filas")
     return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
 # ---------------------------------------------
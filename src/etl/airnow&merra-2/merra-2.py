@@ -1,13 +1,16 @@
 import os
+import sys
 from pathlib import Path
 import datetime as dt
 import logging
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 import earthaccess as ea
 import numpy as np
 import pandas as pd
 import xarray as xr
-from matplotlib.path import Path as PolygonPath
 
 # Carga .env solo en local (no en producción)
 try:
@@ -18,6 +21,18 @@ except Exception:
 
 from google.cloud import bigquery
 
+# Permite ejecutar el script directamente (python "src/etl/airnow&merra-2/merra-2.py"):
+# los módulos compartidos se importan como `src.*` desde la raíz del repositorio.
+_REPO_ROOT = str(Path(__file__).resolve().parents[3])
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from src.etl.utils import DEFAULT_DTYPE_POLICY
+from src.services.earth_data.cache import GranuleCache
+from src.services.earth_data.granules import decode_granule, frames_from_ipc, open_granule
+from src.services.geometry import points_in_polygon
+from src.services.google.bigquery import UploadBuffer
+
 # -----------------------------
 # Logging
 # -----------------------------
@@ -30,6 +45,11 @@ logger = logging.getLogger("merra2_ingest")
 SHORT_NAME = os.getenv("MERRA2_SHORT_NAME", "M2T1NXSLV")
 VERSION    = os.getenv("MERRA2_VERSION", "5.12.4")
 KEEP_VARS  = os.getenv("MERRA2_KEEP_VARS", "T2M,T2MDEW,RH2M,QV2M,U10M,V10M,PS,SLP,TS").split(",")
+# Procesos para decodificar gránulos en paralelo (1 = secuencial)
+DECODE_WORKERS = int(os.getenv("MERRA2_DECODE_WORKERS", "1"))
+# Agrupa gránulos en cargas grandes: se sube al llegar a N filas o a N segundos
+FLUSH_ROWS    = int(os.getenv("MERRA2_FLUSH_ROWS", "2000000"))
+FLUSH_SECONDS = float(os.getenv("MERRA2_FLUSH_SECONDS", "600"))
 
 # Rango: último año (UTC) hasta ayer 23:59:59
 # end_dt   = (dt.datetime.utcnow().replace(microsecond=0, second=59, minute=59))
@@ -101,9 +121,8 @@ def get_bbox(poly):
     return min(lons), min(lats), max(lons), max(lats)
 
 lon_min, lat_min, lon_max, lat_max = get_bbox(polygon_coords)
-poly_path = PolygonPath(polygon_coords)
 
-def ds_to_dataframe(ds: xr.Dataset, keep_vars=None) -> pd.DataFrame:
+def ds_to_dataframe(ds: xr.Dataset) -> pd.DataFrame:
     # MERRA-2 suele estar en 0..360; lo llevamos a -180..180
     try:
         if float(ds.lon.max()) > 180:
@@ -112,22 +131,39 @@ def ds_to_dataframe(ds: xr.Dataset, keep_vars=None) -> pd.DataFrame:
         pass
 
     ds_clip = ds.sel(lat=slice(lat_min, lat_max), lon=slice(lon_min, lon_max))
-    if keep_vars:
-        present = [v for v in keep_vars if v in ds_clip.data_vars]
-        if present:
-            ds_clip = ds_clip[present]
 
     ds_clip = ds_clip.rename({"lat": "latitude", "lon": "longitude"})
     df = ds_clip.to_dataframe().reset_index()
     df.dropna(how="any", inplace=True)
 
     if not df.empty:
-        mask = poly_path.contains_points(df[["longitude", "latitude"]].to_numpy())
+        mask = points_in_polygon(df["longitude"].to_numpy(), df["latitude"].to_numpy(), polygon_coords)
         df = df.loc[mask]
 
     cols = ["time","latitude","longitude"] + [c for c in df.columns if c not in ("time","latitude","longitude")]
     return df[cols]
 
+def tidy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Mismo formato que ds_to_dataframe para filas ya recortadas por el polígono
+    df = df.rename(columns={"lat": "latitude", "lon": "longitude"})
+    df = df.dropna(how="any")
+    cols = ["time","latitude","longitude"] + [c for c in df.columns if c not in ("time","latitude","longitude")]
+    return df[cols]
+
+def decode_file(fp: str) -> pd.DataFrame:
+    # Solo se leen las variables de KEEP_VARS
+    ds = open_granule(fp, variables=KEEP_VARS, decode_times=True, engine="h5netcdf")
+    try:
+        return ds_to_dataframe(ds)
+    finally:
+        ds.close()
+
+def decode_ipc(buffer) -> pd.DataFrame:
+    # Resultado de decode_granule (Arrow IPC) → DataFrame
+    if buffer is None:
+        return pd.DataFrame()
+    return tidy_frame(pd.concat(frames_from_ipc(buffer), ignore_index=True))
+
 def ensure_dataset(client: bigquery.Client, dataset_id: str, location: str = "US"):
     ds_ref = bigquery.Dataset(f"{client.project}.{dataset_id}")
     try:
@@ -157,47 +193,89 @@ def run_ingest():
     client = bigquery.Client(project=BQ_PROJECT)
     ensure_dataset(client, BQ_DATASET, location=BQ_LOC)
 
-    loaded_total = 0
-
-    for i, gran in enumerate(results, start=1):
-        # Descarga a /tmp y procesa 1 por 1 (memoria amigable)
-        try:
-            saved_paths = ea.download(gran, local_path=str(DATA_DIR))
-        except Exception as e:
-            logger.error(f"Falló download granule: {e}")
-            continue
+    # Un load job por lote de gránulos (no uno por archivo); se re-aplican los
+    # dtypes porque concat convierte categóricas distintas en object
+    buffer = UploadBuffer(
+        upload=lambda df: upload_df(client, DEFAULT_DTYPE_POLICY.apply(df), dataset=BQ_DATASET, table=BQ_TABLE),
+        max_rows=FLUSH_ROWS,
+        max_seconds=FLUSH_SECONDS,
+    )
+    # Caché de gránulos compartida (opcional, vía EARTHDATA_CACHE_DIR)
+    cache = GranuleCache.from_env()
 
-        for fpath in (saved_paths or []):
+    def iter_downloads():
+        for i, gran in enumerate(results, start=1):
+            # Descarga a /tmp y procesa 1 por 1 (memoria amigable)
             try:
-                fp = str(fpath)
-                ds = xr.open_dataset(fp, decode_times=True, engine="h5netcdf")
-                df = ds_to_dataframe(ds, keep_vars=KEEP_VARS)
-                ds.close()
-
-                if df.empty:
-                    logger.info(f"[{i}] vacío tras filtros → {fp}")
-                    continue
+                if cache is not None:
+                    # Fijados en la caché hasta procesarlos (un pin por archivo),
+                    # para que las descargas siguientes no los desalojen
+                    saved_paths = cache.fetch(gran, lambda d: ea.download(gran, local_path=d), pin=True)
+                    for _ in saved_paths[1:]:
+                        cache.pin(cache.key(gran))
+                else:
+                    saved_paths = ea.download(gran, local_path=str(DATA_DIR))
+            except Exception as e:
+                logger.error(f"Falló download granule: {e}")
+                continue
+            for fpath in (saved_paths or []):
+                yield i, gran, str(fpath)
 
-                # campos extra
-                df["time"] = pd.to_datetime(df["time"], utc=True)
-                df["source_product"] = SHORT_NAME
-                df["source_version"] = VERSION
+    def load_file(i, gran, fp, decode):
+        try:
+            df = decode()
 
-                upload_df(client, df, dataset=BQ_DATASET, table=BQ_TABLE)
+            if df.empty:
+                logger.info(f"[{i}] vacío tras filtros → {fp}")
+                return
 
-                loaded_total += len(df)
-                logger.info(f"[{i}] uploaded: {len(df):,} rows (total {loaded_total:,})")
-            except Exception as e:
-                logger.error(f"Error procesando {fpath}: {e}")
-            finally:
-                # Limpia archivo para no llenar /tmp
+            # campos extra; float32, tiempo UTC y etiquetas categóricas
+            df["source_product"] = SHORT_NAME
+            df["source_version"] = VERSION
+            df = DEFAULT_DTYPE_POLICY.apply(df)
+        except Exception as e:
+            logger.error(f"Error procesando {fp}: {e}")
+            return
+        finally:
+            # Limpia archivo para no llenar /tmp (los de la caché se conservan
+            # y solo se liberan)
+            if cache is not None:
+                cache.release(gran)
+            else:
                 try:
-                    Path(fpath).unlink(missing_ok=True)
+                    Path(fp).unlink(missing_ok=True)
                 except Exception:
                     pass
 
-    logger.info(f"Done. Total rows uploaded: {loaded_total:,}")
-    return {"rows_total": loaded_total, "granules": len(results)}
+        # Fuera del try: un error al subir un lote (write puede vaciar el
+        # buffer) no es culpa de este archivo y debe detener la ingesta
+        buffer.write(df)
+        logger.info(f"[{i}] buffered: {len(df):,} rows")
+
+    if DECODE_WORKERS > 1:
+        # Decodifica en varios procesos; cada uno devuelve un buffer Arrow IPC.
+        # "fork" evita que los procesos vuelvan a ejecutar este script.
+        with ProcessPoolExecutor(DECODE_WORKERS, mp_context=mp.get_context("fork")) as pool:
+            pending = deque()
+            for i, gran, fp in iter_downloads():
+                future = pool.submit(
+                    decode_granule, fp, polygon_coords,
+                    variables=KEEP_VARS, decode_times=True, engine="h5netcdf",
+                )
+                pending.append((i, gran, fp, future))
+                while len(pending) >= DECODE_WORKERS or (pending and pending[0][3].done()):
+                    j, done_gran, done_fp, done = pending.popleft()
+                    load_file(j, done_gran, done_fp, lambda: decode_ipc(done.result()))
+            while pending:
+                j, done_gran, done_fp, done = pending.popleft()
+                load_file(j, done_gran, done_fp, lambda: decode_ipc(done.result()))
+    else:
+        for i, gran, fp in iter_downloads():
+            load_file(i, gran, fp, lambda: decode_file(fp))
+
+    stats = buffer.close()
+    logger.info(f"Done. Total rows uploaded: {stats['rows']:,} in {stats['flushes']} load jobs")
+    return {"rows_total": stats["rows"], "granules": len(results), "load_jobs": stats["flushes"]}
 
 # -----------------------------
 # Entrypoints
@@ -1,47 +1,284 @@
+from bisect import bisect_right
+from datetime import datetime
+from functools import partial
+
 import pandas as pd
-from src.services.earth_data import EarthDataClient
+from src.etl.utils import (
+    DEFAULT_DTYPE_POLICY,
+    TEMPO_KEY,
+    TEMPO_PRIMARY_VARIABLE,
+    DtypePolicy,
+    KeyDeduplicator,
+    run_shards,
+    split_date_range,
+    summarize_shards,
+)
+from src.services.earth_data import DecodeOptions, EarthDataClient, GranuleManifest
+from src.services.earth_data.cache import granule_time_range
+from src.services.earth_data.manifest import LOADED
 from src.services.google import Google
+from src.services.google.bigquery import UploadBuffer
 from src.services.utils import get_logger
 
 logger = get_logger(__name__)
 
 
+BQ_DATASET = "earth_data"
+BQ_TABLE = "no2_historical"
+# Format of time columns the destination table stores as STRING.
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _conform_to_table(df: pd.DataFrame, table) -> pd.DataFrame:
+    """Format datetime columns as strings where `table` stores STRING.
+
+    no2_historical keeps `time` as a '%Y-%m-%d %H:%M:%S' string, while the
+    dtype policy produces UTC timestamps; loading those would fail on the
+    schema mismatch. A table that does not exist yet is created from the
+    frame's own types, so nothing is converted then.
+    """
+    if table is None:
+        return df
+    string_fields = {field.name for field in table.schema if field.field_type == "STRING"}
+    columns = [
+        name
+        for name in df.columns
+        if name in string_fields and pd.api.types.is_datetime64_any_dtype(df[name])
+    ]
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for name in columns:
+        df[name] = df[name].dt.strftime(TIME_FORMAT)
+    return df
+
+
+def _upload(google: Google, df: pd.DataFrame) -> None:
+    try:
+        logger.info(f"Uploading {len(df)} records to BigQuery...")
+        table = google.bigquery.get_table(BQ_DATASET, BQ_TABLE)
+        _ = google.bigquery.upload_data_from_dataframe(
+            df=_conform_to_table(df, table),
+            dataset=BQ_DATASET,
+            table_id=BQ_TABLE,
+        )
+    except Exception as e:
+        logger.error(f"Error uploading data to BigQuery: {e}")
+        raise
+
+
+def _assign_shards(granules: list, shards: list[tuple[str, str]]) -> list[list]:
+    """Assign each granule to the shard its temporal extent starts in.
+
+    A granule crossing a shard boundary is returned by the searches of both
+    shards; owning it by its start keeps it from being loaded twice.
+    Granules without a usable extent go to the first shard.
+    """
+    starts = [datetime.fromisoformat(start) for start, _ in shards]
+    assigned = [[] for _ in shards]
+    for granule in granules:
+        extent = granule_time_range(granule)
+        index = bisect_right(starts, extent[0]) - 1 if extent else 0
+        assigned[max(index, 0)].append(granule)
+    return assigned
+
+
+def _load_granules(
+    client: EarthDataClient,
+    google: Google,
+    granules: list,
+    polygon: list[tuple[float, float]],
+    max_workers: int,
+    variables: list[str],
+    chunks: dict[str, int],
+    dtype_policy: DtypePolicy,
+    dedup_key: tuple[str, ...],
+    sparse: bool,
+    primary_variable: str,
+    manifest: GranuleManifest,
+    load_batch_rows: int,
+) -> dict[str, int]:
+    """Extract, clean and upload `granules`; return the run's counters."""
+    stats = {
+        "granules": len(granules),
+        "decoded": 0,
+        "extracted": 0,
+        "cleaned": 0,
+        "duplicates": 0,
+    }
+    if manifest is not None:
+        granules = manifest.pending(granules)
+        stats["skipped"] = stats["granules"] - len(granules)
+
+    # Stream granule by granule and drop NaN rows before accumulating, so the
+    # raw (mostly fill) grid of only one granule is held in memory at a time.
+    # In sparse mode the fill cells are not even turned into rows.
+    batch = []
+    dedup = KeyDeduplicator(dedup_key)
+
+    def mark_loaded() -> None:
+        if manifest is not None:
+            for granule, rows in batch:
+                manifest.mark(granule, LOADED, rows=rows)
+        batch.clear()
+
+    # Re-applied because concat turns mismatched categoricals into objects.
+    buffer = UploadBuffer(
+        upload=lambda df: _upload(google, dtype_policy.apply(df)),
+        max_rows=load_batch_rows,
+        max_bytes=None,
+        on_flush=mark_loaded,
+    )
+    if not granules:
+        return stats
+    for granule, granule_frames in client.iter_granules(
+        granules,
+        polygon,
+        max_workers=max_workers,
+        options=DecodeOptions(
+            variables=variables,
+            chunks=chunks,
+            sparse=sparse,
+            primary_variable=primary_variable,
+        ),
+        manifest=manifest,
+    ):
+        stats["decoded"] += 1
+        frames = []
+        for frame in granule_frames:
+            stats["extracted"] += len(frame)
+            frame = frame.dropna()
+            if not frame.empty:
+                frame = dedup(dtype_policy.apply(frame))
+            if not frame.empty:
+                frames.append(frame)
+        rows = sum(len(frame) for frame in frames)
+        stats["cleaned"] += rows
+        # A granule's rows always go into a single upload, so it is marked
+        # loaded only once all of them are.
+        batch.append((granule, rows))
+        buffer.write(frames)
+    buffer.close()
+    mark_loaded()
+    stats["uploads"] = buffer.flushes
+    stats["duplicates"] = dedup.removed
+    return stats
+
+
 def extract_and_load_no2(
     dataset_name: str = "TEMPO_NO2_L3",
     dataset_version: str = "V03",
     start_date: str = "2025-01-01 00:00:00",
     end_date: str = "2025-01-01 15:59:59",
     polygon: list[tuple[float, float]] = None,
-) -> None:
+    max_workers: int = 1,
+    variables: list[str] = None,
+    chunks: dict[str, int] = None,
+    dtype_policy: DtypePolicy = DEFAULT_DTYPE_POLICY,
+    dedup_key: tuple[str, ...] = TEMPO_KEY,
+    sparse: bool = True,
+    primary_variable: str = TEMPO_PRIMARY_VARIABLE,
+    manifest: GranuleManifest = None,
+    load_batch_rows: int = 5_000_000,
+    shard: str = None,
+    max_parallel_shards: int = 1,
+) -> dict:
     """
     Extract data from EarthData and load it into BigQuery.
+
+    `max_workers` sets how many granules are downloaded concurrently,
+    `variables` restricts the extracted columns and `chunks` enables the
+    out-of-core block-by-block mode (see `DecodeOptions`).
+    `dtype_policy` sets the compact dtypes applied to each granule and
+    `dedup_key` the natural key duplicates are dropped on, granule by granule.
+    With `sparse` only cells where `primary_variable` (a "group/name" for
+    variables outside the root group) is observed are emitted.
+
+    Cleaned rows are uploaded every `load_batch_rows` rows. With a `manifest`
+    (by default the one configured through `EARTHDATA_MANIFEST`) the granules
+    of each uploaded batch are marked as loaded, and a rerun after a failure
+    only processes the granules that were not loaded yet.
+
+    With `shard` ("hour", "day" or "week") the window is split into shards
+    (see `split_date_range`) that are loaded independently, at most
+    `max_parallel_shards` at a time. The window is searched once and each
+    granule is loaded by the shard it starts in. Failed shards do not stop
+    the others; a RuntimeError listing them is raised at the end, and with a
+    manifest a rerun only redoes their granules.
+
+    Returns the run's counters (granules, decoded, extracted, cleaned,
+    duplicates and, when sharded, shards, failed and seconds). A ValueError
+    is raised when no granule could be downloaded and decoded.
     """
     client = EarthDataClient()
     google = Google()
+    if manifest is None:
+        manifest = GranuleManifest.from_env(
+            scope=f"{dataset_name}/{dataset_version}:{BQ_DATASET}.{BQ_TABLE}"
+        )
     logger.info(
         f"Extracting data for {dataset_name} version {dataset_version} from {start_date} to {end_date}"
     )
-    df = client.get_data(dataset_name, dataset_version, start_date, end_date, polygon)
+    granules = client.search(dataset_name, dataset_version, start_date, end_date, polygon)
+    if not granules:
+        logger.warning("No data extracted. Exiting.")
+        raise ValueError("No data extracted from EarthData.")
+
+    load = partial(
+        _load_granules,
+        client,
+        google,
+        polygon=polygon,
+        max_workers=max_workers,
+        variables=variables,
+        chunks=chunks,
+        dtype_policy=dtype_policy,
+        dedup_key=dedup_key,
+        sparse=sparse,
+        primary_variable=primary_variable,
+        manifest=manifest,
+        load_batch_rows=load_batch_rows,
+    )
+    if shard is None:
+        stats = load(granules)
+    else:
+        shards = split_date_range(start_date, end_date, shard)
+        by_shard = dict(zip(shards, _assign_shards(granules, shards)))
+        logger.info(
+            f"Running {len(shards)} {shard} shards, {max_parallel_shards} at a time."
+        )
+        results = run_shards(
+            lambda start, end: load(by_shard[(start, end)]),
+            shards,
+            max_parallel=max_parallel_shards,
+        )
+        stats = summarize_shards(results)
+        logger.info(f"Sharded run finished: {stats}")
+        if stats["failed"]:
+            raise RuntimeError(
+                f"{len(stats['failed'])} of {len(shards)} shards failed: {stats['failed']}"
+            )
+
+    if stats.get("skipped") == stats["granules"]:
+        logger.info("All granules are already loaded. Exiting.")
+        return stats
     logger.info(
-        f"Extracted {len(df)} records from {dataset_name} version {dataset_version}."
+        f"Extracted {stats['extracted']} records from {dataset_name} version {dataset_version}."
     )
-    if df.empty:
+    if stats["extracted"] == 0 and sparse and stats["decoded"]:
+        # Granules were decoded but hold only fill cells (e.g. at night).
+        logger.warning("No observed cells extracted. Exiting.")
+        return stats
+    if stats["extracted"] == 0:
         logger.warning("No data extracted. Exiting.")
         raise ValueError("No data extracted from EarthData.")
+    if stats["cleaned"] == 0:
+        logger.warning("All extracted records are empty after cleaning. Exiting.")
+        return stats
 
-    df = df.dropna()
-    df = df.drop_duplicates()
-    df['time'] = pd.to_datetime(df['time']).dt.strftime('%Y-%m-%d %H:%M:%S')
-    logger.info(f"Data cleaned. {len(df)} records remaining after cleaning.")
-    try:
-        logger.info("Uploading data to BigQuery...")
-        _ = google.bigquery.upload_data_from_dataframe(
-            df=df,
-            dataset="earth_data",
-            table_id="no2_historical",
-        )
-    except Exception as e:
-        logger.error(f"Error uploading data to BigQuery: {e}")
-        raise
+    logger.info(
+        f"Data cleaned. {stats['cleaned']} records remaining after cleaning "
+        f"({stats['duplicates']} duplicates removed)."
+    )
     logger.info("Data successfully loaded into BigQuery.")
-    return None
+    return stats
@@ -9,8 +9,15 @@ def main():
 
     short_name = "TEMPO_NO2_L3"
     version = "V03"
-    date_start = "2024-04-01 00:00:00"
-    date_end = "2024-04-30 23:59:59"
+    date_start = os.getenv("NO2_START_DATE", "2024-04-01 00:00:00")
+    date_end = os.getenv("NO2_END_DATE", "2024-04-30 23:59:59")
+    # The window is split into shards ("hour", "day" or "week", empty to
+    # disable) loaded NO2_MAX_PARALLEL_SHARDS at a time.
+    shard = os.getenv("NO2_SHARD", "day") or None
+    # Optional comma-separated projection, e.g.
+    # "product/vertical_column_troposphere,product/main_data_quality_flag"
+    variables = os.getenv("NO2_VARIABLES")
+    variables = variables.split(",") if variables else None
     polygon_coords = [
         (-120.0091050, 41.9727325),
         (-124.6045661, 41.8898826),
@@ -29,6 +36,10 @@ def main():
         start_date=date_start,
         end_date=date_end,
         polygon=polygon_coords,
+        max_workers=int(os.getenv("EARTHDATA_DOWNLOAD_WORKERS", "4")),
+        variables=variables,
+        shard=shard,
+        max_parallel_shards=int(os.getenv("NO2_MAX_PARALLEL_SHARDS", "2")),
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+"""Streaming sinks for extracted rows."""
+import os
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DEFAULT_ROW_GROUP_SIZE = 1_000_000
+DEFAULT_COMPRESSION = "zstd"
+PARTITION_NAME = "date"
+
+
+class ParquetSink:
+    """
+    Append frames to Parquet as they are produced.
+
+    Rows are buffered until `row_group_size` rows have accumulated and are
+    then written as row groups, so memory is bounded by one row group per
+    open file rather than by the whole result.
+
+    Without `partition_by` everything goes to the single file `path`. With
+    it, `path` is a Hive-partitioned dataset with one ``date=YYYY-MM-DD``
+    directory per day of the `partition_by` timestamp column. At most
+    `max_open_files` partition files are kept open; the least recently
+    written one is closed (and becomes readable) when another is needed,
+    and a partition that receives rows again gets a new part file. Files are
+    written under a hidden name and renamed when closed, so readers of the
+    dataset never see a partially written file.
+
+    Attributes:
+        rows: Number of rows written.
+        files: Paths of the files closed so far.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        partition_by: Optional[str] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        compression: str = DEFAULT_COMPRESSION,
+        max_open_files: int = 8,
+    ):
+        if row_group_size < 1:
+            raise ValueError("row_group_size must be positive.")
+        self.path = str(path)
+        self.partition_by = partition_by
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.max_open_files = max(int(max_open_files), 1)
+        self.rows = 0
+        self.files: List[str] = []
+        self._schema: Optional[pa.Schema] = None
+        self._run_id = uuid.uuid4().hex[:8]
+        self._parts = 0
+        self._closed = False
+        # partition -> (writer, in-progress path, final path), in LRU order.
+        self._writers: "OrderedDict[Optional[str], tuple]" = OrderedDict()
+        self._buffers: Dict[Optional[str], List[pa.Table]] = {}
+        self._buffered: Dict[Optional[str], int] = {}
+
+    def __enter__(self) -> "ParquetSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write(self, data: Union[pd.DataFrame, pa.Table, pa.RecordBatch]) -> None:
+        """
+        Append rows to the sink.
+
+        Args:
+            data: Rows with the same columns as the first write.
+        """
+        if isinstance(data, pd.DataFrame):
+            table = pa.Table.from_pandas(data, preserve_index=False)
+        elif isinstance(data, pa.RecordBatch):
+            table = pa.Table.from_batches([data])
+        else:
+            table = data
+        if table.num_rows == 0:
+            return
+        if self._schema is None:
+            self._schema = table.schema.remove_metadata()
+        table = table.select(self._schema.names).cast(self._schema)
+
+        if self.partition_by is None:
+            self._buffer(None, table)
+            return
+        dates = pc.strftime(table[self.partition_by], format="%Y-%m-%d")
+        for date in pc.unique(dates).to_pylist():
+            self._buffer(date, table.filter(pc.equal(dates, date)))
+
+    def close(self) -> None:
+        """Flush buffered rows and close every open file."""
+        if self._closed:
+            return
+        self._closed = True
+        for key in list(self._buffers):
+            self._flush(key, partial=True)
+        for key in list(self._writers):
+            self._close_writer(key)
+        if self.files:
+            return
+        # Nothing was written; leave a valid (empty) output behind.
+        if self.partition_by is None:
+            pq.write_table((self._schema or pa.schema([])).empty_table(), self.path)
+            self.files.append(self.path)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+
+    def _buffer(self, key: Optional[str], table: pa.Table) -> None:
+        self._buffers.setdefault(key, []).append(table)
+        self._buffered[key] = self._buffered.get(key, 0) + table.num_rows
+        if self._buffered[key] >= self.row_group_size:
+            self._flush(key)
+
+    def _flush(self, key: Optional[str], partial: bool = False) -> None:
+        # Write whole row groups and keep the remainder buffered, unless
+        # `partial` (on close).
+        tables = self._buffers.pop(key, None)
+        self._buffered.pop(key, None)
+        if not tables:
+            return
+        table = pa.concat_tables(tables)
+        size = table.num_rows if partial else table.num_rows - table.num_rows % self.row_group_size
+        if size:
+            self._writer(key).write_table(table.slice(0, size), row_group_size=self.row_group_size)
+            self.rows += size
+        if size < table.num_rows:
+            self._buffers[key] = [table.slice(size)]
+            self._buffered[key] = table.num_rows - size
+
+    def _writer(self, key: Optional[str]) -> pq.ParquetWriter:
+        if key in self._writers:
+            self._writers.move_to_end(key)
+            return self._writers[key][0]
+        while len(self._writers) >= self.max_open_files:
+            self._close_writer(next(iter(self._writers)))
+
+        if self.partition_by is None:
+            final = self.path
+        else:
+            directory = os.path.join(self.path, f"{PARTITION_NAME}={key}")
+            os.makedirs(directory, exist_ok=True)
+            final = os.path.join(directory, f"part-{self._run_id}-{self._parts:05d}.parquet")
+            self._parts += 1
+        parent, name = os.path.split(final)
+        in_progress = os.path.join(parent, f".{name}.inprogress")
+        writer = pq.ParquetWriter(in_progress, self._schema, compression=self.compression)
+        self._writers[key] = (writer, in_progress, final)
+        return writer
+
+    def _close_writer(self, key: Optional[str]) -> None:
+        writer, in_progress, final = self._writers.pop(key)
+        writer.close()
+        os.replace(in_progress, final)
+        self.files.append(final)
@@ -1 +1,308 @@
-¨¨¨ETL UTILS¨¨¨
+"""ETL utilities shared by the extraction and load jobs."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+from src.services.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class DtypePolicy:
+    """
+    Compact dtypes for extracted frames.
+
+    Frames built from xarray keep float64 for every variable and coordinate.
+    Applying the policy to each granule before concatenation roughly halves
+    memory and upload bytes: measurements become float32, time columns
+    become ``datetime64[ns, UTC]`` and repeated string labels become
+    categoricals. Coordinates stay float64 by default: they are join keys,
+    and float32 values such as 34.02 widen to 34.02000045776367 in BigQuery.
+
+    Attributes:
+        float_dtype: Dtype for floating point measurements, or None to keep them.
+        coordinate_dtype: Dtype for latitude/longitude columns, or None to keep them.
+        coordinates: Names treated as coordinates.
+        time_columns: Columns converted to UTC timestamps (naive values are
+            assumed to be UTC).
+        categoricals: Columns always converted to categoricals.
+        categorical_ratio: Other string columns are made categorical when
+            their share of distinct values is at most this ratio.
+    """
+
+    float_dtype: Optional[str] = "float32"
+    coordinate_dtype: Optional[str] = None
+    coordinates: Tuple[str, ...] = ("latitude", "longitude", "lat", "lon")
+    time_columns: Tuple[str, ...] = ("time",)
+    categoricals: Tuple[str, ...] = ("source", "source_product", "source_version")
+    categorical_ratio: float = 0.5
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Return `df` with the policy's dtypes.
+
+        Columns that already have the target dtype are not copied, so the
+        policy can be re-applied after `pd.concat` (which turns categoricals
+        with different categories back into objects) at little cost.
+
+        Args:
+            df: A frame of extracted rows.
+
+        Returns:
+            pd.DataFrame: The converted frame.
+        """
+        dtypes = {}
+        for name, dtype in df.dtypes.items():
+            if name in self.time_columns:
+                if not isinstance(dtype, pd.DatetimeTZDtype) or str(dtype.tz) != "UTC":
+                    dtypes[name] = None
+            elif ptypes.is_float_dtype(dtype):
+                target = self.coordinate_dtype if name in self.coordinates else self.float_dtype
+                if target is not None and dtype != target:
+                    dtypes[name] = target
+            elif isinstance(dtype, pd.CategoricalDtype):
+                continue
+            elif ptypes.is_object_dtype(dtype) or ptypes.is_string_dtype(dtype):
+                if name in self.categoricals or (
+                    len(df) and df[name].nunique() <= self.categorical_ratio * len(df)
+                ):
+                    dtypes[name] = "category"
+        if not dtypes:
+            return df
+
+        df = df.copy(deep=False)
+        for name, target in dtypes.items():
+            if target is None:
+                df[name] = pd.to_datetime(df[name], utc=True)
+            else:
+                df[name] = df[name].astype(target)
+        return df
+
+
+DEFAULT_DTYPE_POLICY = DtypePolicy()
+
+
+TEMPO_KEY = ("time", "latitude", "longitude")
+# Variable whose observed cells are kept in sparse mode for TEMPO NO2 granules.
+TEMPO_PRIMARY_VARIABLE = "product/vertical_column_troposphere"
+
+
+class KeyDeduplicator:
+    """
+    Streaming dedup of frames on a declared natural key.
+
+    Only the key columns are hashed (to 64 bits per row), instead of every
+    column as in `DataFrame.drop_duplicates`. Rows are compared within each
+    frame and against the keys of earlier frames, so frames can be
+    deduplicated one granule or partition at a time. Seen keys are kept per
+    value of the `partition` column as sorted hash arrays, which keeps each
+    lookup proportional to the partition rather than to the whole stream.
+
+    Attributes:
+        key: Columns that identify a row.
+        partition: Key column used to bucket seen keys; defaults to the first.
+        rows: Number of rows seen.
+        removed: Number of duplicate rows removed.
+    """
+
+    def __init__(self, key: Sequence[str] = TEMPO_KEY, partition: Optional[str] = None):
+        if not key:
+            raise ValueError("A dedup key needs at least one column.")
+        self.key = list(key)
+        self.partition = partition or self.key[0]
+        if self.partition not in self.key:
+            raise ValueError(f"Partition column {self.partition!r} must be part of the key.")
+        self.rows = 0
+        self.removed = 0
+        self._seen: Dict[Hashable, np.ndarray] = {}
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop rows of `df` whose key was already seen.
+
+        Args:
+            df: A frame containing the key columns.
+
+        Returns:
+            pd.DataFrame: `df` without duplicate keys (the first row is kept).
+        """
+        if df.empty:
+            return df
+        hashes = pd.util.hash_pandas_object(df[self.key], index=False).to_numpy()
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+
+        codes, values = pd.factorize(df[self.partition], use_na_sentinel=False)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+        for code, value in enumerate(values):
+            # NaN != NaN, so all missing partition values share one bucket.
+            value = None if pd.isna(value) else value
+            rows = order[bounds[code]:bounds[code + 1]]
+            seen = self._seen.get(value)
+            if seen is not None and seen.size:
+                found = np.minimum(np.searchsorted(seen, hashes[rows]), seen.size - 1)
+                keep[rows] &= seen[found] != hashes[rows]
+            new = hashes[rows[keep[rows]]]
+            self._seen[value] = np.union1d(seen, new) if seen is not None else np.unique(new)
+
+        removed = int(len(df) - keep.sum())
+        self.rows += len(df)
+        self.removed += removed
+        return df[keep] if removed else df
+
+    def reset(self) -> None:
+        """Forget the keys seen so far and zero the counters."""
+        self.rows = 0
+        self.removed = 0
+        self._seen.clear()
+
+
+SHARD_SIZES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _shard_floor(value: datetime, shard: str) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if shard == "hour":
+        return value
+    value = value.replace(hour=0)
+    if shard == "week":
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def split_date_range(
+    start_date: str, end_date: str, shard: str = "day"
+) -> List[Tuple[str, str]]:
+    """
+    Split an inclusive date window into calendar-aligned shards.
+
+    Shards start on hour, day or week (Monday) boundaries and end one second
+    before the next one, like the hand-written ``00:00:00``/``23:59:59``
+    windows of the notebooks. The first and last shards are clipped to the
+    window.
+
+    Args:
+        start_date: Window start, e.g. ``"2024-04-01 00:00:00"``.
+        end_date: Inclusive window end.
+        shard: One of ``"hour"``, ``"day"`` or ``"week"``.
+
+    Returns:
+        list[tuple[str, str]]: ``(start_date, end_date)`` pairs in order.
+    """
+    if shard not in SHARD_SIZES:
+        raise ValueError(f"Unknown shard size {shard!r}; expected one of {tuple(SHARD_SIZES)}")
+    start = datetime.fromisoformat(str(start_date))
+    end = datetime.fromisoformat(str(end_date))
+    if end < start:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}.")
+
+    shards = []
+    step = SHARD_SIZES[shard]
+    boundary = _shard_floor(start, shard)
+    while boundary <= end:
+        following = boundary + step
+        shard_start = max(boundary, start)
+        shard_end = min(following - timedelta(seconds=1), end)
+        shards.append((shard_start.strftime(DATE_FORMAT), shard_end.strftime(DATE_FORMAT)))
+        boundary = following
+    return shards
+
+
+@dataclass
+class ShardResult:
+    """
+    Outcome of one shard of a sharded run.
+
+    Attributes:
+        start_date: Shard start.
+        end_date: Shard end (inclusive).
+        stats: Counters returned by the shard function.
+        seconds: Wall time of the shard.
+        error: The error message if the shard failed, else None.
+    """
+
+    start_date: str
+    end_date: str
+    stats: Dict[str, Any] = field(default_factory=dict)
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_shards(
+    func: Callable[[str, str], Optional[Dict[str, Any]]],
+    shards: Sequence[Tuple[str, str]],
+    max_parallel: int = 1,
+) -> List[ShardResult]:
+    """
+    Run `func(start_date, end_date)` for every shard with bounded parallelism.
+
+    Shards run on a thread pool of `max_parallel` workers. A failing shard
+    is logged and recorded in its result instead of cancelling the others,
+    so one bad day does not cost the rest of a backfill.
+
+    Args:
+        func: Called with each shard's window; may return a dict of counters.
+        shards: ``(start_date, end_date)`` pairs, e.g. from `split_date_range`.
+        max_parallel: Maximum number of shards running at once.
+
+    Returns:
+        list[ShardResult]: One result per shard, in shard order.
+    """
+
+    def run(window: Tuple[str, str]) -> ShardResult:
+        result = ShardResult(*window)
+        started = time.monotonic()
+        try:
+            result.stats = dict(func(*window) or {})
+        except Exception as e:
+            logger.error(f"Shard {window[0]} - {window[1]} failed: {e}")
+            result.error = str(e) or type(e).__name__
+        result.seconds = time.monotonic() - started
+        if result.ok:
+            logger.info(f"Shard {window[0]} - {window[1]} done in {result.seconds:.1f}s: {result.stats}")
+        return result
+
+    max_parallel = max(int(max_parallel), 1)
+    if max_parallel == 1 or len(shards) <= 1:
+        return [run(window) for window in shards]
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(shards))) as executor:
+        return list(executor.map(run, shards))
+
+
+def summarize_shards(results: Sequence[ShardResult]) -> Dict[str, Any]:
+    """
+    Aggregate per-shard results.
+
+    Args:
+        results: Results of `run_shards`.
+
+    Returns:
+        dict: The numeric counters summed over shards, plus ``shards``,
+        ``failed`` (the windows of failed shards) and ``seconds`` (the sum of
+        shard wall times).
+    """
+    summary: Dict[str, Any] = {}
+    for result in results:
+        for name, value in result.stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                summary[name] = summary.get(name, 0) + value
+    summary["shards"] = len(results)
+    summary["failed"] = [(r.start_date, r.end_date) for r in results if not r.ok]
+    summary["seconds"] = sum(r.seconds for r in results)
+    return summary
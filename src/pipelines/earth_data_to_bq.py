@@ -5,8 +5,13 @@ import pandas as pd
 from kfp.v2 import dsl
 from kfp.v2.dsl import component, Dataset, Input, Output
 
-from src.services.earth_data import EarthDataClient
+from src.etl.sinks import DEFAULT_COMPRESSION, DEFAULT_ROW_GROUP_SIZE, ParquetSink
+from src.etl.utils import DEFAULT_DTYPE_POLICY, TEMPO_PRIMARY_VARIABLE, KeyDeduplicator
+from src.services.earth_data import DecodeOptions, EarthDataClient
 from src.services.google import Google
+from src.services.utils import get_logger
+
+logger = get_logger(__name__)
 
 
 @component(
@@ -29,28 +34,59 @@ def get_data_component(
     end_date: str,
     polygon_str: str,
     output_dataset: Output[Dataset] = None,
+    partition_by: str = "",
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    compression: str = DEFAULT_COMPRESSION,
+    primary_variable: str = TEMPO_PRIMARY_VARIABLE,
 ):
     """
     Get data from EarthData and save it to a parquet file as a Vertex AI pipeline dataset.
+    Only cells where `primary_variable` ("group/name" for variables outside
+    the root group; "" for the first variable) is observed are extracted,
+    each granule is converted to compact dtypes and appended to the output
+    as row groups as soon as it is decoded.
+    Set `partition_by` to a timestamp column (e.g. "time") to write a
+    Hive-partitioned dataset by date instead of a single file.
     """
     polygon = json.loads(polygon_str)
     client = EarthDataClient()
-    df = client.get_data(dataset_name, dataset_version, start_date, end_date, polygon)
-    df.to_parquet(output_dataset.path)
+    with ParquetSink(
+        output_dataset.path,
+        partition_by=partition_by or None,
+        row_group_size=row_group_size,
+        compression=compression,
+    ) as sink:
+        for frame in client.iter_frames(
+            dataset_name,
+            dataset_version,
+            start_date,
+            end_date,
+            polygon,
+            options=DecodeOptions(sparse=True, primary_variable=primary_variable or None),
+        ):
+            sink.write(DEFAULT_DTYPE_POLICY.apply(frame))
+    logger.info(f"Wrote {sink.rows} rows to {len(sink.files)} files.")
 
 
 @component(base_image="python:3.13-slim", packages_to_install=["pandas", "pyarrow"])
 def clean_data_component(
-    input_dataset: Input[Dataset], output_dataset: Output[Dataset] = None
+    input_dataset: Input[Dataset],
+    output_dataset: Output[Dataset] = None,
+    key_columns: str = "time,latitude,longitude",
 ):
     """
     Clean the data by removing NaNs and duplicates.
+    Duplicates are rows sharing the natural key `key_columns` (comma separated).
+    The input (a file or a partitioned dataset) is streamed batch by batch.
     """
+    import pyarrow.dataset as pads
 
-    df = pd.read_parquet(input_dataset.path)
-    df = df.dropna()
-    df = df.drop_duplicates()
-    df.to_parquet(output_dataset.path)
+    dedup = KeyDeduplicator(key_columns.split(","))
+    source = pads.dataset(input_dataset.path, format="parquet")
+    with ParquetSink(output_dataset.path) as sink:
+        for batch in source.to_batches():
+            sink.write(dedup(batch.to_pandas().dropna()))
+    logger.info(f"Removed {dedup.removed} duplicates out of {dedup.rows} rows.")
 
 
 @component(
@@ -80,6 +116,7 @@ def earth_data_pipeline(
     table_id: str,
     start_date: str = None,
     end_date: str = None,
+    primary_variable: str = TEMPO_PRIMARY_VARIABLE,
 ):
     """
     Get Earth data, clean it, and upload to BigQuery.
@@ -95,6 +132,7 @@ def earth_data_pipeline(
         start_date=start_date,
         end_date=end_date,
         polygon_str=polygon_str,
+        primary_variable=primary_variable,
     )
     clean_data_task = clean_data_component(
         input_dataset=get_data_task.outputs["output_dataset"]
@@ -0,0 +1,137 @@
+"""Building blocks shared by the on-disk caches of the services."""
+import os
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from src.services.utils import get_logger
+
+logger = get_logger("cache")
+
+Entry = Tuple[Path, float, int]
+
+
+@contextmanager
+def sqlite_connection(path: Union[str, Path], timeout: float = 30) -> Iterator[sqlite3.Connection]:
+    """Open a sqlite connection for a single transaction.
+
+    The transaction is committed when the block exits normally and rolled
+    back on an exception; the connection is always closed, so no file handle
+    outlives the block. `timeout` is how long to wait for a lock held by
+    another process.
+    """
+    conn = sqlite3.connect(path, timeout=timeout)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class LRUDiskCache:
+    """Base class of size-bounded caches evicted in least-recently-used order.
+
+    Each entry is a file or directory under `root`, named after its key.
+    Recency is tracked through the entry's mtime (subclasses touch it on a
+    hit), which makes a cache safe to share between processes pointing at
+    the same root. Entries still in use in this process can be pinned, and
+    are then never evicted by it. Subclasses implement `_path`, `_entries`
+    and `_remove`.
+
+    Args:
+        root: Directory holding the entries. Created if missing.
+        max_bytes: Byte budget. Least recently used entries are evicted once
+            the cache grows beyond it.
+    """
+
+    #: Name of the cache in eviction log messages.
+    label = "cache"
+
+    def __init__(self, root: Union[str, Path], max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._pins: Counter = Counter()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def _from_env(cls, root_var: str, max_bytes_var: str, default_max_bytes: int):
+        root = os.getenv(root_var)
+        if not root:
+            return None
+        return cls(root, max_bytes=int(os.getenv(max_bytes_var, default_max_bytes)))
+
+    def pin(self, key: str) -> None:
+        """Protect an entry from eviction until a matching `unpin`.
+
+        Pins are counted, so an entry fetched by several threads stays
+        protected until each of them unpins it.
+        """
+        with self._lock:
+            self._pins[key] += 1
+
+    def unpin(self, key: str) -> None:
+        """Release one pin taken with `pin`.
+
+        When the entry's last pin goes, the cache is evicted again: entries
+        pinned while others were added may have left it over budget.
+        """
+        with self._lock:
+            self._pins[key] -= 1
+            released = self._pins[key] <= 0
+            if released:
+                del self._pins[key]
+        if released:
+            self.evict()
+
+    def size(self) -> int:
+        """Return the number of bytes currently held by the cache."""
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Evict least recently used entries until the cache fits its budget.
+
+        Pinned entries are never evicted.
+
+        Args:
+            keep: Key of an entry that must not be evicted (typically the one
+                just added).
+
+        Returns:
+            int: Number of bytes freed.
+        """
+        with self._lock:
+            kept = {self._path(key) for key in self._pins}
+            if keep is not None:
+                kept.add(self._path(keep))
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            total = sum(size for _, _, size in entries)
+            freed = 0
+            for path, _, size in entries:
+                if total - freed <= self.max_bytes:
+                    break
+                if path in kept:
+                    continue
+                try:
+                    self._remove(path)
+                except FileNotFoundError:
+                    # Evicted concurrently by another process.
+                    continue
+                freed += size
+                logger.info(f"Evicted {path.name} ({size:,} bytes) from {self.label}")
+        return freed
+
+    def _path(self, key: str) -> Path:
+        """Return the path of the entry stored under `key`."""
+        raise NotImplementedError
+
+    def _entries(self) -> List[Entry]:
+        """Return ``(path, mtime, size)`` for every entry."""
+        raise NotImplementedError
+
+    def _remove(self, path: Path) -> None:
+        """Delete an entry."""
+        raise NotImplementedError
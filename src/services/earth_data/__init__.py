@@ -1,6 +1,13 @@
 """src/services/earth_data/__init__.py: EarthData service package."""
+from .cache import GranuleCache, SearchCache
 from .client import EarthDataClient
+from .granules import DecodeOptions
+from .manifest import GranuleManifest
 
 __all__ = [
-    "EarthDataClient"
+    "DecodeOptions",
+    "EarthDataClient",
+    "GranuleCache",
+    "GranuleManifest",
+    "SearchCache",
 ]
\ No newline at end of file
@@ -0,0 +1,355 @@
+"""src/services/earth_data/aio.py: asyncio EarthData client."""
+import asyncio
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Executor
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import earthaccess as ea
+from earthaccess.results import DataGranule
+
+from src.services.earth_data.cache import GranuleCache, SearchCache, parse_time
+from src.services.earth_data.client import Frame
+from src.services.earth_data.granules import (
+    DEFAULT_DECODE_OPTIONS,
+    DecodeOptions,
+    batches_from_ipc,
+    decode_granule,
+    frames_from_ipc,
+)
+from src.services.earth_data.remote import granule_urls
+from src.services.utils import get_logger
+
+logger = get_logger("earthdata-aio")
+
+CMR_GRANULES_URL = "https://cmr.earthdata.nasa.gov/search/granules.umm_json"
+CMR_PAGE_SIZE = 2000
+DEFAULT_CONCURRENCY = 4
+DOWNLOAD_CHUNK_SIZE = 1024**2
+
+
+def cmr_polygon(polygon: Sequence[Tuple[float, float]]) -> str:
+    """Format (longitude, latitude) vertices as a CMR ``polygon`` parameter.
+
+    CMR expects a closed ring in counter-clockwise order; clockwise input is
+    reversed and an open ring is closed.
+    """
+    points = [(float(x), float(y)) for x, y in polygon]
+    if points[0] != points[-1]:
+        points.append(points[0])
+    area = sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:]))
+    if area < 0:
+        points.reverse()
+    return ",".join(f"{x},{y}" for x, y in points)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _cmr_time(value: str) -> str:
+    return parse_time(value).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class AsyncEarthDataClient:
+    """An asyncio client for searching, downloading and decoding EarthData granules.
+
+    CMR searches and granule downloads go through one `aiohttp` session,
+    authenticated with the EarthData Login bearer token. A semaphore caps the
+    number of concurrent downloads across every `iter_frames` call sharing
+    the client, so several product/date shards can run in one event loop
+    without overloading the DAAC. Decoding is offloaded to `executor` (the
+    loop's default thread pool unless given; pass a `ProcessPoolExecutor`
+    to decode on several cores) and never blocks the loop.
+
+    Use it as an async context manager so the HTTP session is closed::
+
+        async with AsyncEarthDataClient(max_concurrency=8) as client:
+            async for frame in client.iter_frames(...):
+                ...
+
+    Parameters
+    ----------
+    max_concurrency : int
+        Maximum number of granules downloaded at once.
+    executor : concurrent.futures.Executor, optional
+        Executor running `decode_granule`.
+    token : str, optional
+        EarthData Login bearer token. Defaults to the token of an
+        `ea.login` with `EARTHDATA_USERNAME` / `EARTHDATA_PASSWORD`.
+    cmr_url : str
+        CMR granule search endpoint (UMM-JSON).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        executor: Optional[Executor] = None,
+        token: Optional[str] = None,
+        cmr_url: str = CMR_GRANULES_URL,
+    ):
+        if token is None:
+            auth = ea.login(
+                os.getenv("EARTHDATA_USERNAME"), os.getenv("EARTHDATA_PASSWORD")
+            )
+            if not auth.authenticated:
+                raise ValueError(
+                    "Failed to authenticate with EarthData. Check your credentials."
+                )
+            token = (auth.token or {}).get("access_token")
+        self.token = token
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.executor = executor
+        self.cmr_url = cmr_url
+        self.granule_cache: Optional[GranuleCache] = GranuleCache.from_env()
+        self.search_cache: Optional[SearchCache] = SearchCache.from_env()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncEarthDataClient":
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._session = aiohttp.ClientSession(
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=300),
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def search(
+        self,
+        dataset_name: str,
+        dataset_version: str,
+        start_date: str,
+        end_date: str,
+        polygon: List[Tuple[float, float]],
+        cache: Optional[SearchCache] = None,
+    ) -> List:
+        """Search CMR for granules, going through the search cache if any.
+
+        Pages are followed with the ``CMR-Search-After`` header. Results are
+        `DataGranule` objects, interchangeable with those of
+        `EarthDataClient.search`, and are shared with it through the cache.
+        """
+        if cache is None:
+            cache = self.search_cache
+        if cache is not None:
+            granules = await asyncio.to_thread(
+                cache.get, dataset_name, dataset_version, start_date, end_date, polygon
+            )
+            if granules is not None:
+                logger.info(f"Search cache hit ({len(granules)} granules).")
+                return granules
+
+        params = {
+            "short_name": dataset_name,
+            "version": dataset_version,
+            "temporal": f"{_cmr_time(start_date)},{_cmr_time(end_date)}",
+            "page_size": CMR_PAGE_SIZE,
+        }
+        if polygon:
+            params["polygon"] = cmr_polygon(polygon)
+
+        session = self._get_session()
+        granules = []
+        search_after = None
+        while True:
+            headers = {"CMR-Search-After": search_after} if search_after else {}
+            async with session.get(self.cmr_url, params=params, headers=headers) as resp:
+                resp.raise_for_status()
+                payload = await resp.json(content_type=None)
+                search_after = resp.headers.get("CMR-Search-After")
+            items = payload.get("items") or []
+            for item in items:
+                provider = item.get("meta", {}).get("provider-id", "")
+                granules.append(DataGranule(item, cloud_hosted="CLOUD" in provider))
+            if not items or not search_after or len(items) < CMR_PAGE_SIZE:
+                break
+
+        if cache is not None:
+            await asyncio.to_thread(
+                cache.put,
+                dataset_name,
+                dataset_version,
+                start_date,
+                end_date,
+                polygon,
+                granules,
+            )
+        return granules
+
+    async def _download_granule(
+        self, granule, local_path: str, cache: Optional[GranuleCache] = None
+    ) -> Optional[str]:
+        """Download a granule into `local_path` (or `cache`), holding the semaphore.
+
+        Failures are logged and swallowed so one bad granule does not abort
+        the whole run. Cache lookups and file writes run in worker threads so
+        disk I/O never blocks the event loop.
+        """
+        if cache is not None:
+            files = await asyncio.to_thread(cache.get, granule)
+            if files:
+                return files[0]
+        urls = granule_urls(granule)
+        if not urls:
+            logger.warning(f"No data link for granule:\n{granule}")
+            return None
+
+        url = urls[0]
+        path = os.path.join(local_path, os.path.basename(url.split("?")[0]))
+        partial_path = f"{path}.part"
+        session = self._get_session()
+        try:
+            async with self._semaphore:
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    f = await asyncio.to_thread(open, partial_path, "wb")
+                    try:
+                        async for block in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            await asyncio.to_thread(f.write, block)
+                    finally:
+                        await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, partial_path, path)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logger.warning(f"Failed to download granule:\n{url}\nDue to: {e}")
+            await asyncio.to_thread(_remove, partial_path)
+            return None
+
+        if cache is not None:
+            files = await asyncio.to_thread(cache.put, granule, [path])
+            return files[0] if files else None
+        return path
+
+    async def _process_granule(
+        self,
+        granule,
+        local_path: str,
+        cache: Optional[GranuleCache],
+        decode_kwargs: Dict,
+    ):
+        """Download and decode one granule; return its Arrow IPC buffer or None.
+
+        A cached granule stays pinned until it is decoded, so the downloads
+        running next to it cannot evict it first.
+        """
+        if cache is not None:
+            cache.pin(cache.key(granule))
+        fp = None
+        try:
+            fp = await self._download_granule(granule, local_path, cache)
+            if fp is None:
+                return None
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    self.executor, partial(decode_granule, fp, **decode_kwargs)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to decode {fp}: {e}")
+                return None
+        finally:
+            if cache is not None:
+                cache.release(granule)
+            elif fp is not None:
+                await asyncio.to_thread(_remove, fp)
+
+    async def iter_frames(
+        self,
+        dataset_name: str,
+        dataset_version: str,
+        start_date: str,
+        end_date: str,
+        polygon: List[Tuple[float, float]],
+        prefetch: Optional[int] = None,
+        cache: Optional[GranuleCache] = None,
+        options: Optional[DecodeOptions] = None,
+    ) -> AsyncIterator[Frame]:
+        """Search for granules and asynchronously yield their contents.
+
+        Granules are downloaded and decoded concurrently (bounded by the
+        client's semaphore and executor) and their frames are yielded in
+        search order. Granules that fail to download or decode, or that have
+        no rows inside the polygon, are skipped.
+
+        Parameters
+        ----------
+        dataset_name, dataset_version, start_date, end_date, polygon
+            Granule search parameters, as in `EarthDataClient.iter_frames`.
+        prefetch : int, optional
+            Maximum number of granules in flight ahead of the consumer.
+            Defaults to ``2 * max_concurrency``.
+        cache : GranuleCache, optional
+            On-disk granule cache. Defaults to the cache configured through
+            `EARTHDATA_CACHE_DIR`, if any.
+        options : DecodeOptions, optional
+            As in `EarthDataClient.iter_frames`.
+
+        Yields
+        ------
+        pd.DataFrame or pa.RecordBatch
+            The rows of one granule (or of one block of it) inside `polygon`.
+        """
+        granules = await self.search(
+            dataset_name, dataset_version, start_date, end_date, polygon
+        )
+        if not granules:
+            logger.warning("No granules found.")
+            return
+        logger.info(f"Found {len(granules)} granules.")
+        if cache is None:
+            cache = self.granule_cache
+
+        if options is None:
+            options = DEFAULT_DECODE_OPTIONS
+        decode_kwargs = dict(options.decode_kwargs(), polygon=polygon)
+        unpack = batches_from_ipc if options.as_arrow else frames_from_ipc
+        window = max(prefetch or 2 * self.max_concurrency, 1)
+        remaining = iter(granules)
+        pending: deque = deque()
+        tmpdir = tempfile.mkdtemp(prefix="earthdata_")
+
+        def submit(granule) -> asyncio.Task:
+            return asyncio.ensure_future(
+                self._process_granule(granule, tmpdir, cache, decode_kwargs)
+            )
+
+        try:
+            for granule in islice(remaining, window):
+                pending.append(submit(granule))
+            while pending:
+                buffer = await pending.popleft()
+                following = next(remaining, None)
+                if following is not None:
+                    pending.append(submit(following))
+                if buffer is not None:
+                    for frame in unpack(buffer):
+                        yield frame
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            await asyncio.to_thread(shutil.rmtree, tmpdir, ignore_errors=True)
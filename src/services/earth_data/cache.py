@@ -0,0 +1,407 @@
+"""src/services/earth_data/cache.py: On-disk caches for EarthData granules and searches."""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+from earthaccess.results import DataGranule
+
+from src.services.cache import LRUDiskCache, sqlite_connection
+from src.services.utils import get_logger
+
+logger = get_logger("earthdata-cache")
+
+DEFAULT_MAX_BYTES = 20 * 1024**3
+DEFAULT_SEARCH_TTL = 24 * 3600
+_STAGING_DIR = ".staging"
+
+
+def granule_id(granule) -> str:
+    """Return a stable identifier for a granule.
+
+    Uses the CMR native id (the granule file name) when available, falling
+    back to the concept id. Plain strings are returned unchanged, which keeps
+    the helper usable with fake granules in local experiments.
+    """
+    if isinstance(granule, str):
+        return granule
+    meta = granule.get("meta", {}) if hasattr(granule, "get") else {}
+    umm = granule.get("umm", {}) if hasattr(granule, "get") else {}
+    gid = meta.get("native-id") or umm.get("GranuleUR") or meta.get("concept-id")
+    if not gid:
+        raise ValueError(f"Cannot determine an id for granule: {granule}")
+    return str(gid)
+
+
+def granule_checksum(granule) -> Optional[str]:
+    """Return the first checksum CMR publishes for a granule, if any."""
+    if not hasattr(granule, "get"):
+        return None
+    info = granule.get("umm", {}).get("DataGranule", {})
+    for archive in info.get("ArchiveAndDistributionInformation", []) or []:
+        value = (archive.get("Checksum") or {}).get("Value")
+        if value:
+            return str(value)
+    return None
+
+
+def parse_time(value: str) -> datetime:
+    """Parse a CMR/`ea.search_data` timestamp into a naive UTC datetime."""
+    parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def granule_time_range(granule) -> Optional[Tuple[datetime, datetime]]:
+    """Return the ``(begin, end)`` temporal extent CMR reports for a granule."""
+    if not hasattr(granule, "get"):
+        return None
+    extent = granule.get("umm", {}).get("TemporalExtent", {})
+    try:
+        if "RangeDateTime" in extent:
+            rng = extent["RangeDateTime"]
+            begin = parse_time(rng["BeginningDateTime"])
+            end = parse_time(rng.get("EndingDateTime") or rng["BeginningDateTime"])
+            return begin, end
+        if "SingleDateTime" in extent:
+            single = parse_time(extent["SingleDateTime"])
+            return single, single
+    except (KeyError, TypeError, ValueError):
+        return None
+    return None
+
+
+class GranuleCache(LRUDiskCache):
+    """Size-bounded, least-recently-used on-disk cache of downloaded granules.
+
+    Every granule lives in its own directory under `root`, named after its id
+    and checksum, so a granule that is reprocessed upstream gets a new entry.
+    Recency is tracked through the entry directory's mtime, which makes the
+    cache safe to share between processes (ETL jobs, `merra-2.py`, notebooks)
+    that point at the same root.
+
+    Parameters
+    ----------
+    root : str or Path
+        Directory holding the cached granules. Created if missing.
+    max_bytes : int
+        Byte budget. Least recently used granules are evicted once the cache
+        grows beyond it.
+    """
+
+    label = "granule cache"
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(root, max_bytes)
+        (self.root / _STAGING_DIR).mkdir(exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["GranuleCache"]:
+        """Return the cache rooted at `EARTHDATA_CACHE_DIR`, or None if unset.
+
+        The budget is read from `EARTHDATA_CACHE_MAX_BYTES`.
+        """
+        return cls._from_env("EARTHDATA_CACHE_DIR", "EARTHDATA_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+
+    def key(self, granule) -> str:
+        """Return the cache key (entry directory name) for a granule."""
+        key = re.sub(r"[^A-Za-z0-9._-]", "_", granule_id(granule))
+        checksum = granule_checksum(granule)
+        if checksum:
+            key = f"{key}-{checksum[:16]}"
+        return key
+
+    def get(self, granule) -> Optional[List[str]]:
+        """Return the cached files of a granule, or None on a cache miss.
+
+        A hit marks the entry as most recently used.
+        """
+        entry = self._path(self.key(granule))
+        try:
+            files = sorted(str(p) for p in entry.iterdir() if p.is_file())
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not files:
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return files
+
+    def put(self, granule, paths: Iterable[Union[str, Path]]) -> List[str]:
+        """Move downloaded files into the cache and return their cached paths.
+
+        If another process cached the same granule in the meantime, its copy
+        wins and the given files are discarded.
+        """
+        key = self.key(granule)
+        entry = self._path(key)
+        staging = Path(tempfile.mkdtemp(dir=self.root / _STAGING_DIR))
+        try:
+            for p in paths:
+                shutil.move(str(p), staging / Path(p).name)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # Entry already exists: keep the copy that landed first.
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        files = self.get(granule) or []
+        self.evict(keep=key)
+        return files
+
+    def fetch(
+        self, granule, download: Callable[[str], Iterable], pin: bool = False
+    ) -> List[str]:
+        """Return the cached files of a granule, downloading them on a miss.
+
+        Parameters
+        ----------
+        granule
+            Granule object as returned by `ea.search_data`.
+        download : callable
+            Called with a scratch directory; must download the granule there
+            and return the written paths, e.g.
+            ``lambda d: ea.download(granule, local_path=d)``.
+        pin : bool
+            Keep the entry from being evicted (e.g. by the downloads of the
+            granules prefetched after it) until `release` is called. Only
+            taken when files are returned.
+        """
+        key = self.key(granule)
+        if pin:
+            self.pin(key)
+        files: List[str] = []
+        try:
+            files = self._fetch(granule, key, download)
+        finally:
+            if pin and not files:
+                self.unpin(key)
+        return files
+
+    def _fetch(self, granule, key: str, download: Callable[[str], Iterable]) -> List[str]:
+        files = self.get(granule)
+        if files is not None:
+            logger.info(f"Cache hit for {key}")
+            return files
+
+        scratch = tempfile.mkdtemp(dir=self.root / _STAGING_DIR)
+        try:
+            downloaded = [str(p) for p in (download(scratch) or [])]
+            if not downloaded:
+                return []
+            return self.put(granule, downloaded)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def release(self, granule) -> None:
+        """Release the pin taken by ``fetch(granule, ..., pin=True)``."""
+        self.unpin(self.key(granule))
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _remove(self, path: Path) -> None:
+        shutil.rmtree(path, ignore_errors=True)
+
+    def _entries(self) -> List[tuple]:
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.name == _STAGING_DIR or not entry.is_dir():
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+                size = sum(p.stat().st_size for p in entry.iterdir() if p.is_file())
+            except FileNotFoundError:
+                # Evicted concurrently by another process.
+                continue
+            entries.append((entry, mtime, size))
+        return entries
+
+
+class SearchCache:
+    """Persistent cache of `ea.search_data` results backed by sqlite.
+
+    Entries are keyed by ``(short_name, version, temporal, polygon)`` and
+    expire after `ttl` seconds. A search whose time window lies inside a
+    fresh, wider cached search for the same product and polygon is answered
+    locally by filtering the cached granules on their temporal extent. Running
+    one wide search up front therefore lets every per-day shard of a backfill
+    skip its own CMR round trip.
+
+    Parameters
+    ----------
+    path : str or Path
+        sqlite database file. Created if missing.
+    ttl : float
+        Time-to-live of an entry, in seconds.
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: float = DEFAULT_SEARCH_TTL):
+        self.path = Path(path)
+        self.ttl = float(ttl)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS searches (
+                    short_name TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    polygon TEXT NOT NULL,
+                    start TEXT NOT NULL,
+                    end TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    granules TEXT NOT NULL,
+                    PRIMARY KEY (short_name, version, polygon, start, end)
+                )
+                """
+            )
+
+    @classmethod
+    def from_env(cls) -> Optional["SearchCache"]:
+        """Return the cache stored at `EARTHDATA_SEARCH_CACHE`, or None if unset.
+
+        Entries live for `EARTHDATA_SEARCH_CACHE_TTL` seconds.
+        """
+        path = os.getenv("EARTHDATA_SEARCH_CACHE")
+        if not path:
+            return None
+        ttl = float(os.getenv("EARTHDATA_SEARCH_CACHE_TTL", DEFAULT_SEARCH_TTL))
+        return cls(path, ttl=ttl)
+
+    @staticmethod
+    def _key(
+        short_name: str,
+        version: str,
+        start_date: str,
+        end_date: str,
+        polygon: Optional[Sequence[Tuple[float, float]]],
+    ) -> tuple:
+        polygon_key = json.dumps(
+            [[float(x), float(y)] for x, y in polygon] if polygon else None
+        )
+        return (
+            str(short_name),
+            str(version),
+            polygon_key,
+            parse_time(start_date).isoformat(),
+            parse_time(end_date).isoformat(),
+        )
+
+    @staticmethod
+    def _dump(granules: List) -> str:
+        return json.dumps(
+            [
+                {
+                    "granule": dict(g),
+                    "data_granule": isinstance(g, DataGranule),
+                    "cloud_hosted": getattr(g, "cloud_hosted", False),
+                }
+                for g in granules
+            ]
+        )
+
+    @staticmethod
+    def _load(payload: str) -> List:
+        granules = []
+        for item in json.loads(payload):
+            if item["data_granule"]:
+                granules.append(
+                    DataGranule(item["granule"], cloud_hosted=item["cloud_hosted"])
+                )
+            else:
+                granules.append(item["granule"])
+        return granules
+
+    def get(
+        self,
+        short_name: str,
+        version: str,
+        start_date: str,
+        end_date: str,
+        polygon: Optional[Sequence[Tuple[float, float]]],
+    ) -> Optional[List]:
+        """Return cached granules for a search, or None on a cache miss.
+
+        An exact match is preferred. Otherwise the narrowest fresh search
+        covering ``[start_date, end_date]`` is filtered down to the granules
+        overlapping the requested window.
+        """
+        short_name, version, polygon_key, start, end = self._key(
+            short_name, version, start_date, end_date, polygon
+        )
+        with sqlite_connection(self.path) as conn:
+            row = conn.execute(
+                """
+                SELECT start, end, granules FROM searches
+                WHERE short_name = ? AND version = ? AND polygon = ?
+                  AND start <= ? AND end >= ? AND created_at >= ?
+                ORDER BY (start = ? AND end = ?) DESC, start DESC, end ASC
+                LIMIT 1
+                """,
+                (
+                    short_name,
+                    version,
+                    polygon_key,
+                    start,
+                    end,
+                    time.time() - self.ttl,
+                    start,
+                    end,
+                ),
+            ).fetchone()
+        if row is None:
+            return None
+
+        granules = self._load(row[2])
+        if (row[0], row[1]) == (start, end):
+            return granules
+
+        window_start, window_end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+        selected = []
+        for granule in granules:
+            extent = granule_time_range(granule)
+            if extent is None:
+                # Cannot place this granule in time; fall back to a real search.
+                return None
+            if extent[0] <= window_end and extent[1] >= window_start:
+                selected.append(granule)
+        return selected
+
+    def put(
+        self,
+        short_name: str,
+        version: str,
+        start_date: str,
+        end_date: str,
+        polygon: Optional[Sequence[Tuple[float, float]]],
+        granules: List,
+    ) -> None:
+        """Store the granules returned by a search."""
+        key = self._key(short_name, version, start_date, end_date, polygon)
+        with sqlite_connection(self.path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, time.time(), self._dump(granules)),
+            )
+
+    def clear(self, expired_only: bool = False) -> int:
+        """Delete cached searches and return how many were removed."""
+        with sqlite_connection(self.path) as conn:
+            if expired_only:
+                cur = conn.execute(
+                    "DELETE FROM searches WHERE created_at < ?",
+                    (time.time() - self.ttl,),
+                )
+            else:
+                cur = conn.execute("DELETE FROM searches")
+            return cur.rowcount
@@ -1,17 +1,43 @@
 import os
 import tempfile
 import shutil
-from typing import List, Tuple
+from collections import deque
+from contextlib import closing
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple, Union
 
 import earthaccess as ea
 import pandas as pd
-import xarray as xr
+import pyarrow as pa
 
-from matplotlib.path import Path as PolygonPath
+from src.services.earth_data.cache import GranuleCache, SearchCache
+from src.services.earth_data.granules import (
+    DEFAULT_DECODE_OPTIONS,
+    DecodeOptions,
+    batches_from_ipc,
+    dataset_batches,
+    dataset_frames,
+    decode_granule,
+    frames_from_ipc,
+    open_granule,
+)
+from src.services.earth_data.manifest import DECODED, DOWNLOADED, GranuleManifest
+from src.services.earth_data.remote import (
+    check_remote_engine,
+    granule_urls,
+    open_remote_granule,
+)
 from src.services.utils import get_logger
 
 logger = get_logger("earthdata-client")
 
+# A block of rows, as a DataFrame or (with ``DecodeOptions.as_arrow``) a record batch.
+Frame = Union[pd.DataFrame, pa.RecordBatch]
+# A frame tagged with its granule; a None frame marks a fully decoded granule.
+TaggedFrame = Tuple[object, Optional[Frame]]
+
 
 class EarthDataClient:
     """A singleton client for interacting with NASA EarthData.
@@ -19,17 +45,34 @@ class EarthDataClient:
     Notes
     -----
     - `get_data` returns a pandas.DataFrame constructed from one or more
-      granules returned by `ea.search_data`.
-    - Files are downloaded and processed one-at-a-time into temporary files
-      to avoid keeping all raw granules in memory simultaneously.
+      granules returned by `ea.search_data`; `iter_frames` yields the same
+      rows one granule at a time. With `DecodeOptions.as_arrow` both produce
+      Arrow data (a `pyarrow.Table` / record batches) without going through
+      pandas.
+    - Files are downloaded into temporary files and decoded one-at-a-time as
+      they arrive, so only a bounded number of raw granules is ever kept on
+      disk simultaneously.
+    - When a `GranuleCache` is configured (explicitly or through
+      `EARTHDATA_CACHE_DIR`) granules are kept in it instead of being
+      deleted, and later runs read them from disk instead of downloading.
+    - When a `SearchCache` is configured (assign `search_cache` or set
+      `EARTHDATA_SEARCH_CACHE`) CMR searches are answered from it. Calling
+      `search` once over a whole backfill window lets every narrower
+      `get_data` call inside that window skip its CMR round trip.
     """
 
     _instance = None
+    granule_cache: Optional[GranuleCache]
+    search_cache: Optional[SearchCache]
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.client = ea
+            # Set once: `__init__` runs on every `EarthDataClient()` call and
+            # must not replace caches assigned on the shared instance.
+            cls._instance.granule_cache = GranuleCache.from_env()
+            cls._instance.search_cache = SearchCache.from_env()
         return cls._instance
 
     def __init__(self):
@@ -60,55 +103,278 @@ class EarthDataClient:
         except (TypeError, ValueError, RuntimeError):
             return []
 
-    def _filter_polygon(
-        self, data: pd.DataFrame, polygon: list[tuple[float, float]]
-    ) -> pd.DataFrame:
-        """Filter a DataFrame by a polygon.
+    def _download_granule(
+        self, granule, local_path: str, cache: Optional[GranuleCache] = None
+    ) -> Optional[str]:
+        """Download a single granule into `local_path`, or fetch it via `cache`.
 
-        Parameters
-        ----------
-        polygon : list[tuple[float, float]]
-            A list of (longitude, latitude) tuples defining the polygon.
+        Failures are logged and swallowed so one bad granule does not abort
+        the whole run. A cached file is pinned until `_discard` releases it,
+        so the downloads prefetched after it cannot evict it before it is
+        decoded.
 
         Returns
         -------
-        pd.DataFrame
-            The filtered DataFrame.
+        str or None
+            Path of the downloaded file, or None if the download failed.
         """
-        polygon_path = PolygonPath(polygon)
-        mask = polygon_path.contains_points(data[['longitude', 'latitude']].values)
-        return data[mask]
+        try:
+            if cache is not None:
+                dl = cache.fetch(
+                    granule, lambda d: ea.download(granule, local_path=d), pin=True
+                )
+            else:
+                dl = ea.download(granule, local_path=local_path)
+            return str(dl[0])
+        except (RuntimeError, OSError, ValueError, TypeError, IndexError) as e:
+            logger.warning(f"Failed to download granule:\n{granule}\nDue to: {e}")
+            return None
 
-    def get_data(
+    def _iter_downloads(
+        self,
+        granules: List,
+        local_path: str,
+        max_workers: int = 1,
+        prefetch: Optional[int] = None,
+        cache: Optional[GranuleCache] = None,
+    ) -> Iterator[Tuple[object, str]]:
+        """Yield downloaded file paths while later granules keep downloading.
+
+        Downloads run on a thread pool (the producer) and are handed to the
+        caller (the consumer) in search order. At most `prefetch` downloads are
+        queued ahead of the consumer; a new one is only submitted once the
+        consumer takes a file, so the number of raw granules sitting in
+        `local_path` never exceeds ``prefetch + 1``.
+
+        Parameters
+        ----------
+        granules : list
+            Granule objects as returned by `ea.search_data`.
+        local_path : str
+            Directory where the files are written.
+        max_workers : int
+            Size of the download thread pool.
+        prefetch : int, optional
+            Maximum number of downloads queued ahead of the consumer. Defaults
+            to `max_workers`.
+        cache : GranuleCache, optional
+            Cache consulted before downloading and filled afterwards.
+
+        Yields
+        ------
+        tuple
+            ``(granule, path)`` for each successfully downloaded file.
+        """
+        max_workers = max(max_workers, 1)
+        prefetch = max(prefetch or max_workers, 1)
+        remaining = iter(granules)
+        pending: deque[Tuple[object, Future]] = deque()
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="earthdata-dl"
+        ) as executor:
+            def submit(granule) -> Tuple[object, Future]:
+                return granule, executor.submit(
+                    self._download_granule, granule, local_path, cache
+                )
+
+            try:
+                for granule in islice(remaining, prefetch):
+                    pending.append(submit(granule))
+                while pending:
+                    granule, future = pending.popleft()
+                    path = future.result()
+                    for following in islice(remaining, 1):
+                        pending.append(submit(following))
+                    if path is not None:
+                        yield granule, path
+            finally:
+                for granule, future in pending:
+                    # Downloads the consumer will not take still hold a pin.
+                    if not future.cancel() and cache is not None:
+                        if future.result() is not None:
+                            cache.release(granule)
+
+    def _iter_granule_frames(
+        self,
+        granule,
+        file_path: str,
+        polygon: Optional[List[Tuple[float, float]]] = None,
+        options: DecodeOptions = DEFAULT_DECODE_OPTIONS,
+        remote_fs=None,
+    ) -> Iterator[TaggedFrame]:
+        """Decode one granule file into DataFrames (or record batches).
+
+        `file_path` is a local path, or a URL read through HTTP range
+        requests when `remote_fs` is given.
+
+        The dataset is projected onto the variables selected in `options`
+        and clipped to the bounding box of `polygon` before any tabular
+        conversion, so unneeded variables and cells far outside the area of
+        interest are never read or turned into rows. On regular lat/lon
+        grids the polygon is applied through a cached grid mask; other
+        layouts fall back to a per-row filter.
+
+        Yields
+        ------
+        tuple
+            ``(granule, frame)`` with the rows of the file inside `polygon`:
+            a single frame, or one per block with `options.chunks`, then
+            ``(granule, None)`` once the file is fully decoded. The end
+            marker is not yielded if the file could not be opened or
+            decoded.
+        """
+        try:
+            if remote_fs is not None:
+                ds = open_remote_granule(file_path, fs=remote_fs, **options.open_kwargs())
+            else:
+                ds = open_granule(file_path, **options.open_kwargs())
+        except (OSError, ValueError, RuntimeError, TypeError) as e:
+            logger.warning(f"Failed to open {file_path}: {e}")
+            return
+
+        tabulate = dataset_batches if options.as_arrow else dataset_frames
+        try:
+            for frame in tabulate(
+                ds,
+                polygon,
+                chunks=options.chunks,
+                sparse=options.sparse,
+                primary_variable=options.primary_variable,
+            ):
+                yield granule, frame
+            yield granule, None
+        except (KeyError, IndexError, OSError, ValueError, RuntimeError, TypeError) as e:
+            # Same isolation as the process pool: e.g. a missing primary
+            # variable or coordinate skips this granule, not the whole run.
+            logger.warning(f"Failed to decode {file_path}: {e}")
+        finally:
+            try:
+                ds.close()
+            except (RuntimeError, OSError):
+                pass
+
+    def _discard(self, granule, file_path: str, cache: Optional[GranuleCache]) -> None:
+        """Remove a decoded file to avoid accumulating many files, or release
+        its pin when it is owned by the cache."""
+        if cache is not None:
+            cache.release(granule)
+            return
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except (OSError, PermissionError):
+            pass
+
+    def _iter_pool_frames(
+        self,
+        downloads: Iterator[Tuple[object, str]],
+        decode_workers: int,
+        cache: Optional[GranuleCache],
+        polygon: Optional[List[Tuple[float, float]]] = None,
+        options: DecodeOptions = DEFAULT_DECODE_OPTIONS,
+    ) -> Iterator[TaggedFrame]:
+        """Decode downloaded files in a process pool, in download order.
+
+        Each worker runs `decode_granule` and sends back an Arrow IPC buffer.
+        At most `decode_workers` files are being decoded at once; the next
+        download is only pulled when a slot frees up, which keeps the
+        download pipeline's backpressure intact. Frames are tagged like in
+        `_iter_granule_frames`.
+        """
+        pending: deque = deque()
+        unpack = batches_from_ipc if options.as_arrow else frames_from_ipc
+        decode_kwargs = options.decode_kwargs()
+
+        def collect() -> Iterator[TaggedFrame]:
+            granule, fp, future = pending.popleft()
+            try:
+                buffer = future.result()
+            except Exception as e:
+                logger.warning(f"Failed to decode {fp}: {e}")
+                return
+            finally:
+                self._discard(granule, fp, cache)
+            if buffer is not None:
+                for frame in unpack(buffer):
+                    yield granule, frame
+            yield granule, None
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=decode_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                try:
+                    for granule, fp in downloads:
+                        future = pool.submit(decode_granule, fp, polygon, **decode_kwargs)
+                        pending.append((granule, fp, future))
+                        if len(pending) >= decode_workers:
+                            yield from collect()
+                    while pending:
+                        yield from collect()
+                finally:
+                    for _, _, future in pending:
+                        future.cancel()
+        finally:
+            # Files never collected (the consumer stopped early); the pool
+            # has shut down, so no worker is still reading them.
+            for granule, fp, _ in pending:
+                self._discard(granule, fp, cache)
+
+    def _iter_remote_frames(
+        self,
+        granules: List,
+        polygon: Optional[List[Tuple[float, float]]] = None,
+        options: DecodeOptions = DEFAULT_DECODE_OPTIONS,
+    ) -> Iterator[TaggedFrame]:
+        """Read granules in place over HTTPS instead of downloading them."""
+        check_remote_engine()
+        fs = ea.get_fsspec_https_session()
+        for granule in granules:
+            urls = granule_urls(granule)
+            if not urls:
+                logger.warning(f"No data link for granule:\n{granule}")
+                continue
+            yield from self._iter_granule_frames(
+                granule, urls[0], polygon, options=options, remote_fs=fs
+            )
+
+    def search(
         self,
         dataset_name: str,
         dataset_version: str,
         start_date: str,
         end_date: str,
         polygon: List[Tuple[float, float]],
-    ) -> pd.DataFrame:
-        """Search for granules and return their concatenated contents as a DataFrame.
-
-        Behavior and guarantees:
-        - Generic: does not assume particular variable names. It converts each
-          xarray.Dataset to a DataFrame via `Dataset.to_dataframe()` then
-          resets the index. This yields a general, tabular representation.
-        - Memory conscious: processes one downloaded file at a time and removes
-          temporary files after use.
+        cache: Optional[SearchCache] = None,
+    ) -> List:
+        """Search CMR for granules, going through the search cache if any.
 
         Parameters
         ----------
         dataset_name, dataset_version, start_date, end_date, polygon
             Passed directly to `ea.search_data`.
+        cache : SearchCache, optional
+            Search cache to use. Defaults to `self.search_cache`.
 
         Returns
         -------
-        pd.DataFrame
-            Concatenation of the per-granule DataFrames. If no data found an
-            empty DataFrame is returned.
+        list
+            Granule objects that can be passed to `ea.download`.
         """
         if not self.is_authenticated:
             raise ValueError("Client is not authenticated. Please login first.")
+        if cache is None:
+            cache = self.search_cache
+
+        if cache is not None:
+            granules = cache.get(
+                dataset_name, dataset_version, start_date, end_date, polygon
+            )
+            if granules is not None:
+                logger.info(f"Search cache hit ({len(granules)} granules).")
+                return granules
 
         search_results = ea.search_data(
             short_name=dataset_name,
@@ -116,62 +382,312 @@ class EarthDataClient:
             temporal=(start_date, end_date),
             polygon=polygon,
         )
+        granules = self._iter_granules(search_results)
+        if cache is not None:
+            cache.put(
+                dataset_name, dataset_version, start_date, end_date, polygon, granules
+            )
+        return granules
+
+    def iter_frames(
+        self,
+        dataset_name: str,
+        dataset_version: str,
+        start_date: str,
+        end_date: str,
+        polygon: List[Tuple[float, float]],
+        max_workers: int = 1,
+        prefetch: Optional[int] = None,
+        cache: Optional[GranuleCache] = None,
+        remote: bool = False,
+        decode_workers: int = 1,
+        options: Optional[DecodeOptions] = None,
+    ) -> Iterator[Frame]:
+        """Search for granules and yield their contents one granule at a time.
+
+        This is the streaming counterpart of `get_data`: each yielded
+        DataFrame holds the polygon-filtered rows of a single granule, so peak
+        memory is bounded by one granule regardless of the date range.
+        Granules that fail to download or decode, or that have no rows
+        inside the polygon, are skipped.
+
+        Parameters
+        ----------
+        dataset_name, dataset_version, start_date, end_date, polygon
+            Passed directly to `ea.search_data`.
+        max_workers : int
+            Number of granules downloaded concurrently.
+        prefetch : int, optional
+            Maximum number of granules downloaded ahead of the decoder.
+            Defaults to `max_workers`.
+        cache : GranuleCache, optional
+            On-disk granule cache. Defaults to the cache configured through
+            `EARTHDATA_CACHE_DIR`, if any. Cached files are kept after
+            decoding.
+        remote : bool
+            Read granules in place with HTTP range requests (through an
+            fsspec block cache) instead of downloading whole files. Only the
+            chunks covering the polygon and the selected variables are
+            fetched. Download and cache options do not apply.
+        decode_workers : int
+            Number of worker processes decoding granules. With more than one,
+            each downloaded file is opened, clipped, masked and tabulated in
+            a separate process and returned as an Arrow IPC buffer, so
+            decoding uses several cores. Ignored in remote mode.
+        options : DecodeOptions, optional
+            Variables to read and how rows are built (block size, sparse
+            mode, DataFrames or Arrow). Defaults to every root-group
+            variable, decoded into one DataFrame per granule.
 
-        if len(search_results) == 0:
+        Yields
+        ------
+        pd.DataFrame or pa.RecordBatch
+            The rows of one granule that fall inside `polygon`, or of one
+            block of a granule when `options.chunks` is given. Record
+            batches are yielded when `options.as_arrow` is True.
+        """
+        granules = self.search(
+            dataset_name, dataset_version, start_date, end_date, polygon
+        )
+        if not granules:
             logger.warning("No granules found.")
-            return pd.DataFrame()
-        logger.info(f"Found {len(search_results)} granules.")
+            return
+        logger.info(f"Found {len(granules)} granules.")
+        for _, frame in self._iter_tagged_frames(
+            granules,
+            polygon,
+            options,
+            max_workers=max_workers,
+            prefetch=prefetch,
+            cache=cache,
+            remote=remote,
+            decode_workers=decode_workers,
+        ):
+            if frame is not None:
+                yield frame
 
-        frames: List[pd.DataFrame] = []
+    def iter_granules(
+        self,
+        granules: List,
+        polygon: List[Tuple[float, float]],
+        max_workers: int = 1,
+        prefetch: Optional[int] = None,
+        cache: Optional[GranuleCache] = None,
+        remote: bool = False,
+        decode_workers: int = 1,
+        options: Optional[DecodeOptions] = None,
+        manifest: Optional[GranuleManifest] = None,
+    ) -> Iterator[Tuple[object, List[Frame]]]:
+        """Decode the given granules and yield their frames grouped by granule.
 
-        tmpdir = tempfile.mkdtemp(prefix="earthdata_")
-        try:
-            file_paths = []
-            for granule in search_results:
-                try:
-                    dl = ea.download(granule, local_path=tmpdir)
-                    file_paths.append(str(dl[0]))
-                except (RuntimeError, OSError, ValueError, TypeError) as e:
-                    logger.warning(
-                        f"Failed to download granule:\n{granule}\nDue to: {e}"
-                    )
-                    continue
+        Unlike `iter_frames` this takes the granules (e.g. from `search`)
+        and reports which granule each batch of rows came from, so callers
+        can checkpoint their progress granule by granule. Granules that fail
+        to download or decode are skipped; granules with no rows inside
+        `polygon` are yielded with an empty list.
 
-            logger.info(f"Downloaded {len(file_paths)} files. Processing...")
-            for fp in file_paths:
-                try:
-                    ds = xr.open_dataset(fp)
-                except (OSError, ValueError, RuntimeError, TypeError):
-                    continue
+        Parameters
+        ----------
+        granules : list
+            Granule objects as returned by `search`. To resume a run, pass
+            ``manifest.pending(granules)``.
+        manifest : GranuleManifest, optional
+            Checkpoint manifest. Granules are marked ``downloaded`` and then
+            ``decoded`` (with their row count) as they progress. Marking
+            them ``loaded`` is up to the caller, once their rows are stored.
 
-                try:
-                    df = ds.to_dataframe().reset_index()
-                    if not df.empty:
-                        frames.append(df)
-                finally:
-                    try:
-                        ds.close()
-                    except (RuntimeError, OSError):
-                        pass
+        The remaining parameters are as in `iter_frames`.
 
-                # Remove the file to avoid accumulating many files
-                try:
-                    if os.path.exists(fp):
-                        os.remove(fp)
-                except (OSError, PermissionError):
-                    pass
+        Yields
+        ------
+        tuple
+            ``(granule, frames)`` for each decoded granule, in search order.
+        """
+        frames: List[Frame] = []
+        current = None
+        for granule, frame in self._iter_tagged_frames(
+            granules,
+            polygon,
+            options,
+            max_workers=max_workers,
+            prefetch=prefetch,
+            cache=cache,
+            remote=remote,
+            decode_workers=decode_workers,
+            manifest=manifest,
+        ):
+            if granule is not current:
+                # Rows of a granule that failed part way are dropped.
+                current, frames = granule, []
+            if frame is not None:
+                frames.append(frame)
+                continue
+            yield granule, frames
+            current, frames = None, []
 
-            if frames:
-                result_df = pd.concat(frames, axis=0, ignore_index=True, copy=False)
-            else:
-                logger.warning("No valid data found.")
-                result_df = pd.DataFrame()
+    def _iter_tagged_frames(
+        self,
+        granules: List,
+        polygon: Optional[List[Tuple[float, float]]],
+        options: Optional[DecodeOptions] = None,
+        max_workers: int = 1,
+        prefetch: Optional[int] = None,
+        cache: Optional[GranuleCache] = None,
+        remote: bool = False,
+        decode_workers: int = 1,
+        manifest: Optional[GranuleManifest] = None,
+    ) -> Iterator[TaggedFrame]:
+        """Run the download/decode pipeline over `granules`.
+
+        Yields ``(granule, frame)`` pairs followed by ``(granule, None)``
+        for every granule that was fully decoded, and records progress in
+        `manifest` when one is given.
+        """
+        if options is None:
+            options = DEFAULT_DECODE_OPTIONS
+
+        def fetched(downloads: Iterator[Tuple[object, str]]) -> Iterator[Tuple[object, str]]:
+            for granule, fp in downloads:
+                if manifest is not None:
+                    manifest.mark(granule, DOWNLOADED)
+                yield granule, fp
+
+        def decoded(tagged: Iterator[TaggedFrame]) -> Iterator[TaggedFrame]:
+            rows = 0
+            current = None
+            for granule, frame in tagged:
+                if granule is not current:
+                    # The previous granule failed before its end marker.
+                    current, rows = granule, 0
+                if frame is not None:
+                    rows += len(frame)
+                else:
+                    if manifest is not None:
+                        manifest.mark(granule, DECODED, rows=rows)
+                    rows = 0
+                yield granule, frame
+
+        if remote:
+            yield from decoded(self._iter_remote_frames(granules, polygon, options))
+            return
+        if cache is None:
+            cache = self.granule_cache
 
-            result_df = self._filter_polygon(result_df, polygon)
-            return result_df
+        tmpdir = tempfile.mkdtemp(prefix="earthdata_")
+        try:
+            # Closing the download generator shuts its thread pool down and
+            # waits for in-flight downloads, so none of them is still writing
+            # into `tmpdir` when it is removed (e.g. when the consumer stops
+            # early or raises).
+            with closing(
+                self._iter_downloads(
+                    granules,
+                    tmpdir,
+                    max_workers=max_workers,
+                    prefetch=prefetch,
+                    cache=cache,
+                )
+            ) as raw_downloads:
+                downloads = fetched(raw_downloads)
+                if decode_workers > 1:
+                    yield from decoded(
+                        self._iter_pool_frames(
+                            downloads, decode_workers, cache, polygon, options
+                        )
+                    )
+                    return
+                for granule, fp in downloads:
+                    try:
+                        yield from decoded(
+                            self._iter_granule_frames(granule, fp, polygon, options)
+                        )
+                    finally:
+                        self._discard(granule, fp, cache)
         finally:
             # cleanup temporary directory
             try:
                 shutil.rmtree(tmpdir)
             except (OSError, PermissionError):
                 pass
+
+    def get_data(
+        self,
+        dataset_name: str,
+        dataset_version: str,
+        start_date: str,
+        end_date: str,
+        polygon: List[Tuple[float, float]],
+        max_workers: int = 1,
+        prefetch: Optional[int] = None,
+        cache: Optional[GranuleCache] = None,
+        remote: bool = False,
+        decode_workers: int = 1,
+        options: Optional[DecodeOptions] = None,
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """Search for granules and return their concatenated contents as a DataFrame.
+
+        Behavior and guarantees:
+        - Generic: does not assume particular variable names. Each
+          xarray.Dataset is flattened with `dataset_to_columns`, which yields
+          the rows and column order of ``Dataset.to_dataframe().reset_index()``
+          straight from the NumPy arrays, without building a MultiIndex.
+        - Spatially subset: gridded granules are clipped to the polygon's
+          bounding box, then masked with the polygon's grid mask, which is
+          computed once per grid and polygon and cached across granules
+          (see `polygon_grid_mask`). Cells outside the polygon never become
+          rows; only grids without 1-D lat/lon coordinates (e.g. L2 swaths)
+          are filtered point by point.
+        - Projected: only the variables selected in `options` are read.
+        - Pipelined: granule N is decoded while the following granules are
+          still downloading. Each file is removed as soon as it is decoded
+          and at most ``prefetch + 1`` raw files are on disk at any time.
+        - Concurrent downloads: with ``max_workers > 1`` granules are fetched
+          through a bounded thread pool. A failed granule is logged and
+          skipped without affecting the others.
+
+        Use `iter_frames` instead when the result does not need to be held in
+        memory all at once.
+
+        Parameters
+        ----------
+        dataset_name, dataset_version, start_date, end_date, polygon
+            Passed directly to `ea.search_data`.
+        max_workers, prefetch, cache, remote, decode_workers, options
+            As in `iter_frames`.
+
+        Returns
+        -------
+        pd.DataFrame or pa.Table
+            Concatenation of the per-granule DataFrames. If no data found an
+            empty DataFrame is returned. With `options.as_arrow` a
+            `pyarrow.Table` is returned instead; it references the record
+            batches without copying them.
+        """
+        as_arrow = options is not None and options.as_arrow
+        frames = list(
+            self.iter_frames(
+                dataset_name,
+                dataset_version,
+                start_date,
+                end_date,
+                polygon,
+                max_workers=max_workers,
+                prefetch=prefetch,
+                cache=cache,
+                remote=remote,
+                decode_workers=decode_workers,
+                options=options,
+            )
+        )
+        logger.info(f"Processed {len(frames)} granules with data.")
+        if not frames:
+            logger.warning("No valid data found.")
+            return pa.table({}) if as_arrow else pd.DataFrame()
+        if as_arrow:
+            # Granules may disagree on a column's type or presence; promote
+            # rather than fail, as pd.concat would.
+            return pa.concat_tables(
+                [pa.Table.from_batches([batch]) for batch in frames],
+                promote_options="permissive",
+            )
+        return pd.concat(frames, axis=0, ignore_index=True, copy=False)
@@ -0,0 +1,587 @@
+"""src/services/earth_data/granules.py: Helpers to turn granule datasets into tables."""
+import importlib.util
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import xarray as xr
+
+from src.services.geometry import (
+    GridMaskCache,
+    Polygon,
+    grid_masks,
+    points_in_polygon,
+    polygon_bbox,
+)
+from src.services.utils import get_logger
+
+logger = get_logger("earthdata-granules")
+
+LATITUDE_NAMES = ("latitude", "lat")
+LONGITUDE_NAMES = ("longitude", "lon")
+
+# A boolean mask over some dimensions of a dataset: ``((dim, ...), mask)``,
+# e.g. a polygon mask over ``(lat_dim, lon_dim)``.
+CellMask = Tuple[Tuple[str, ...], np.ndarray]
+
+HAS_DASK = importlib.util.find_spec("dask") is not None
+
+
+def find_coord(ds: xr.Dataset, names: Iterable[str]) -> Optional[str]:
+    """Return the first of `names` present as a variable of `ds`, if any."""
+    for name in names:
+        if name in ds.variables:
+            return name
+    return None
+
+
+def _index_range(values: np.ndarray, low: float, high: float) -> slice:
+    """Return the contiguous index range of `values` within ``[low, high]``.
+
+    Works for ascending and descending coordinates alike.
+    """
+    inside = np.flatnonzero((values >= low) & (values <= high))
+    if inside.size == 0:
+        return slice(0, 0)
+    return slice(int(inside[0]), int(inside[-1]) + 1)
+
+
+def clip_to_bbox(ds: xr.Dataset, polygon: Optional[Polygon]) -> xr.Dataset:
+    """Clip a gridded dataset to the bounding box of `polygon` by index slicing.
+
+    Only 1-D latitude/longitude coordinates (regular L3 grids such as
+    TEMPO_NO2_L3 or MERRA-2) are clipped. Datasets with 2-D coordinates are
+    returned unchanged and rely on the row-level polygon filter. Longitudes
+    in the 0..360 convention are handled by shifting the box.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        The granule dataset, typically lazily opened so that only the clipped
+        window is ever read from disk.
+    polygon : list[tuple[float, float]] or None
+        (longitude, latitude) vertices. ``None`` disables clipping.
+
+    Returns
+    -------
+    xr.Dataset
+        A view of `ds` restricted to the polygon's bounding box.
+    """
+    if not polygon:
+        return ds
+    lat_name = find_coord(ds, LATITUDE_NAMES)
+    lon_name = find_coord(ds, LONGITUDE_NAMES)
+    if lat_name is None or lon_name is None:
+        return ds
+    lat, lon = ds[lat_name], ds[lon_name]
+    if lat.ndim != 1 or lon.ndim != 1:
+        return ds
+
+    lon_min, lat_min, lon_max, lat_max = polygon_bbox(polygon)
+    lon_values = lon.values
+    if lon_values.size and np.nanmax(lon_values) > 180 and lon_max < 0:
+        lon_min, lon_max = lon_min % 360, lon_max % 360
+
+    return ds.isel(
+        {
+            lat.dims[0]: _index_range(lat.values, lat_min, lat_max),
+            lon.dims[0]: _index_range(lon_values, lon_min, lon_max),
+        }
+    )
+
+
+def _split_groups(names: Optional[Sequence[str]]) -> Dict[str, List[str]]:
+    """Group ``"group/variable"`` names by netCDF group ("" for the root)."""
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for name in names or []:
+        group, _, var = str(name).strip().rpartition("/")
+        groups[group].append(var)
+    return groups
+
+
+def variable_name(name: str) -> str:
+    """Return the name a ``"group/variable"`` has in an opened granule."""
+    return str(name).strip().rpartition("/")[2]
+
+
+def open_granule(
+    path,
+    variables: Optional[Sequence[str]] = None,
+    drop_variables: Optional[Sequence[str]] = None,
+    chunks: Optional[Dict[str, int]] = None,
+    close_with: Sequence = (),
+    include: Sequence[str] = (),
+    **open_kwargs,
+) -> xr.Dataset:
+    """Open a granule lazily, keeping only the requested variables.
+
+    Variables are addressed by name for the root group or as
+    ``"group/name"`` for netCDF groups, e.g.
+    ``"product/vertical_column_troposphere"`` in TEMPO L3 files. Group
+    variables are attached to the root group's coordinates so they tabulate
+    like root variables. Unselected variables are never read from disk.
+
+    Parameters
+    ----------
+    path
+        File path or file-like object accepted by `xr.open_dataset`.
+    variables : list[str], optional
+        Variables to keep. ``None`` keeps every root-group variable.
+    drop_variables : list[str], optional
+        Variables to skip while decoding, using the same naming.
+    chunks : dict[str, int], optional
+        Dask chunk sizes per dimension. Ignored when dask is not installed,
+        in which case variables stay lazily indexed backend arrays.
+    close_with : list, optional
+        Extra objects (e.g. a remote file) closed together with the dataset.
+    include : list[str], optional
+        Variables opened on top of `variables`, also when it is ``None``
+        (e.g. the variable driving sparse mode).
+    **open_kwargs
+        Extra arguments forwarded to `xr.open_dataset` (e.g. ``engine``).
+
+    Returns
+    -------
+    xr.Dataset
+        The projected dataset. Closing it closes every underlying handle.
+    """
+    if chunks and HAS_DASK:
+        open_kwargs["chunks"] = chunks
+    drops = _split_groups(drop_variables)
+    wanted = _split_groups(variables)
+    extra = [name for name in include if name not in (variables or [])]
+    for group, names in _split_groups(extra).items():
+        wanted[group].extend(names)
+    handles = []
+    selected = 0
+    try:
+        root = xr.open_dataset(
+            path, drop_variables=drops.get("") or None, **open_kwargs
+        )
+        handles.append(root)
+        if variables is None and not extra:
+            ds = root.copy(deep=False)
+        else:
+            parts = [root.drop_vars(list(root.data_vars))]
+            root_vars = wanted.pop("", [])
+            if variables is None:
+                root_vars = list(root.data_vars)
+            root_vars = [v for v in dict.fromkeys(root_vars) if v in root.data_vars]
+            parts.append(root[root_vars])
+            selected += len(root_vars)
+
+            for group, names in wanted.items():
+                gds = xr.open_dataset(
+                    path,
+                    group=group,
+                    drop_variables=drops.get(group) or None,
+                    **open_kwargs,
+                )
+                handles.append(gds)
+                present = [v for v in names if v in gds.data_vars]
+                gds = gds[present]
+                shared = {
+                    name: coord
+                    for name, coord in root.coords.items()
+                    if set(coord.dims) <= set(gds.dims)
+                }
+                parts.append(gds.assign_coords(shared))
+                selected += len(present)
+            ds = xr.merge(parts, combine_attrs="drop_conflicts")
+    except Exception:
+        for handle in [*handles, *close_with]:
+            handle.close()
+        raise
+
+    if variables is not None and selected < len(variables):
+        logger.warning(f"Some requested variables were not found in {path}.")
+
+    def close():
+        for handle in [*handles, *close_with]:
+            handle.close()
+
+    ds.set_close(close)
+    return ds
+
+
+def polygon_grid_mask(
+    ds: xr.Dataset,
+    polygon: Optional[Polygon],
+    cache: GridMaskCache = grid_masks,
+) -> Optional[CellMask]:
+    """Return the polygon mask of a regular lat/lon grid, if `ds` has one.
+
+    Masks are looked up in `cache`, so for fixed-grid products the
+    point-in-polygon work is done once per grid and polygon rather than once
+    per granule.
+
+    Returns
+    -------
+    tuple or None
+        ``((lat_dim, lon_dim), mask)`` with a boolean mask of shape
+        ``(n_lat, n_lon)``, or None when `ds` has no 1-D lat/lon coordinates
+        (e.g. L2 swaths) or no polygon is given.
+    """
+    if not polygon:
+        return None
+    lat_name = find_coord(ds, LATITUDE_NAMES)
+    lon_name = find_coord(ds, LONGITUDE_NAMES)
+    if lat_name is None or lon_name is None:
+        return None
+    lat, lon = ds[lat_name], ds[lon_name]
+    if lat.ndim != 1 or lon.ndim != 1 or lat.dims[0] == lon.dims[0]:
+        return None
+
+    lon_values = lon.values
+    if lon_values.size and np.nanmax(lon_values) > 180:
+        lon_values = ((lon_values + 180) % 360) - 180
+    mask = cache.get(lat.values, lon_values, polygon)
+    return (lat.dims[0], lon.dims[0]), mask
+
+
+def dataset_to_columns(
+    ds: xr.Dataset, cell_mask: Optional[CellMask] = None
+) -> Dict[str, np.ndarray]:
+    """Flatten a dataset into NumPy columns, keeping only masked cells.
+
+    Produces the same rows and column order as
+    ``ds.to_dataframe().reset_index()`` but without building a MultiIndex,
+    and applies `cell_mask` by array indexing so cells outside it are never
+    turned into rows.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        The (already clipped) granule dataset.
+    cell_mask : tuple, optional
+        ``((dim, ...), mask)``, e.g. as returned by `polygon_grid_mask`.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One flat array per dimension and variable.
+    """
+    dims = list(ds.dims)
+    shape = tuple(ds.sizes[d] for d in dims)
+
+    def expand(values: np.ndarray, var_dims: Sequence[str]) -> np.ndarray:
+        # Reorder to the dataset's dimension order and broadcast (as a view).
+        order = sorted(range(len(var_dims)), key=lambda i: dims.index(var_dims[i]))
+        values = np.transpose(values, order)
+        present = {var_dims[i] for i in order}
+        return np.broadcast_to(
+            values.reshape([ds.sizes[d] if d in present else 1 for d in dims]), shape
+        )
+
+    selector = None
+    if cell_mask is not None:
+        mask_dims, mask = cell_mask
+        selector = expand(np.asarray(mask), mask_dims)
+
+    def flatten(values: np.ndarray, var_dims: Sequence[str]) -> np.ndarray:
+        full = expand(values, var_dims)
+        return full[selector] if selector is not None else full.reshape(-1)
+
+    columns: Dict[str, np.ndarray] = {}
+    for dim in dims:
+        values = ds[dim].values if dim in ds.variables else np.arange(ds.sizes[dim])
+        columns[dim] = flatten(values, (dim,))
+    for name, var in ds.variables.items():
+        if name in columns:
+            continue
+        columns[name] = flatten(var.values, var.dims)
+    return columns
+
+
+def iter_blocks(
+    ds: xr.Dataset, chunks: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, slice]]:
+    """Yield index slices that cover `ds` in blocks of at most `chunks` cells.
+
+    Dimensions missing from `chunks` are not split. Without `chunks` a
+    single block spanning the whole dataset is produced.
+    """
+    dims = list(ds.dims)
+    ranges = []
+    for dim in dims:
+        size = ds.sizes[dim]
+        step = max(int((chunks or {}).get(dim) or size), 1)
+        ranges.append([slice(i, min(i + step, size)) for i in range(0, size, step)])
+    for block in product(*ranges):
+        yield dict(zip(dims, block))
+
+
+def valid_cell_mask(var: xr.DataArray) -> CellMask:
+    """Return the mask of the observed (non-NaN, non-fill) cells of `var`.
+
+    Fill values are expected to have been decoded to NaN/NaT when the
+    dataset was opened (xarray's default ``mask_and_scale``).
+    """
+    return tuple(var.dims), ~pd.isna(var.values)
+
+
+def combine_cell_masks(ds: xr.Dataset, first: CellMask, second: CellMask) -> CellMask:
+    """Intersect two cell masks over the union of their dimensions."""
+    dims = tuple(d for d in ds.dims if d in first[0] or d in second[0])
+
+    def align(cell_mask: CellMask) -> np.ndarray:
+        mask_dims, mask = cell_mask
+        order = [mask_dims.index(d) for d in dims if d in mask_dims]
+        shape = [ds.sizes[d] if d in mask_dims else 1 for d in dims]
+        return np.transpose(mask, order).reshape(shape)
+
+    return dims, align(first) & align(second)
+
+
+def columns_to_batch(columns: Dict[str, np.ndarray]) -> pa.RecordBatch:
+    """Wrap NumPy columns in an Arrow record batch.
+
+    Numeric columns are wrapped without copying their data; NaN floats
+    become nulls, matching what a pandas -> Arrow conversion produces.
+    """
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, from_pandas=True) for values in columns.values()],
+        names=list(columns),
+    )
+
+
+def dataset_columns(
+    ds: xr.Dataset,
+    polygon: Optional[Polygon] = None,
+    chunks: Optional[Dict[str, int]] = None,
+    sparse: bool = False,
+    primary_variable: Optional[str] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Clip, mask and tabulate a granule dataset, one block at a time.
+
+    The dataset is clipped to the polygon's bounding box, then walked in
+    blocks of `chunks` cells. Only the current block is read and
+    materialized, so peak memory is set by the chunk size rather than by the
+    granule size. Blocks that lie entirely outside the polygon are skipped
+    without being read.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        A lazily opened granule dataset.
+    polygon : list[tuple[float, float]], optional
+        (longitude, latitude) vertices of the area of interest.
+    chunks : dict[str, int], optional
+        Block size per dimension, e.g. ``{"time": 1, "latitude": 256}``.
+        ``None`` processes the clipped dataset in one block.
+    sparse : bool
+        Only emit observed cells: cells where `primary_variable` is NaN or a
+        fill value are dropped on the NumPy arrays, before any other
+        variable is turned into rows.
+    primary_variable : str, optional
+        Variable whose mask drives `sparse`, by name or as
+        ``"group/name"``. Defaults to the first data variable of `ds`.
+
+    Yields
+    ------
+    dict[str, np.ndarray]
+        Non-empty columns of each block, restricted to rows inside `polygon`.
+    """
+    clipped = clip_to_bbox(ds, polygon)
+    grid_mask = polygon_grid_mask(clipped, polygon)
+
+    primary = None
+    if sparse:
+        primary = (
+            variable_name(primary_variable)
+            if primary_variable
+            else next(iter(clipped.data_vars), None)
+        )
+        if primary is not None and primary not in clipped.variables:
+            raise ValueError(f"Primary variable {primary!r} not found in dataset")
+
+    for block_slices in iter_blocks(clipped, chunks):
+        block = clipped.isel(block_slices)
+        cell_mask = None
+        if grid_mask is not None:
+            mask_dims, mask = grid_mask
+            block_mask = mask[block_slices[mask_dims[0]], block_slices[mask_dims[1]]]
+            if not block_mask.any():
+                continue
+            cell_mask = (mask_dims, block_mask)
+        if primary is not None:
+            observed = valid_cell_mask(block[primary])
+            if cell_mask is not None:
+                observed = combine_cell_masks(block, cell_mask, observed)
+            if not observed[1].any():
+                continue
+            cell_mask = observed
+        columns = dataset_to_columns(block, cell_mask)
+        if grid_mask is None:
+            if polygon:
+                lat_name = next((n for n in LATITUDE_NAMES if n in columns), None)
+                lon_name = next((n for n in LONGITUDE_NAMES if n in columns), None)
+                if lat_name is None or lon_name is None:
+                    raise KeyError("Dataset has no latitude/longitude to filter on")
+                inside = points_in_polygon(columns[lon_name], columns[lat_name], polygon)
+                columns = {name: values[inside] for name, values in columns.items()}
+        if columns and len(next(iter(columns.values()))):
+            yield columns
+
+
+def dataset_frames(
+    ds: xr.Dataset,
+    polygon: Optional[Polygon] = None,
+    chunks: Optional[Dict[str, int]] = None,
+    sparse: bool = False,
+    primary_variable: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield `dataset_columns` blocks as DataFrames."""
+    for columns in dataset_columns(
+        ds, polygon, chunks=chunks, sparse=sparse, primary_variable=primary_variable
+    ):
+        yield pd.DataFrame(columns, copy=False)
+
+
+def dataset_batches(
+    ds: xr.Dataset,
+    polygon: Optional[Polygon] = None,
+    chunks: Optional[Dict[str, int]] = None,
+    sparse: bool = False,
+    primary_variable: Optional[str] = None,
+) -> Iterator[pa.RecordBatch]:
+    """Yield `dataset_columns` blocks as Arrow record batches."""
+    for columns in dataset_columns(
+        ds, polygon, chunks=chunks, sparse=sparse, primary_variable=primary_variable
+    ):
+        yield columns_to_batch(columns)
+
+
+@dataclass(frozen=True)
+class DecodeOptions:
+    """How granule files are read and turned into rows.
+
+    One instance is passed through `EarthDataClient.iter_frames`,
+    `iter_granules` and `get_data` (and `AsyncEarthDataClient.iter_frames`)
+    down to the decoders, whether granules are decoded in-process, in a
+    worker pool or read remotely.
+
+    Attributes
+    ----------
+    variables : list[str], optional
+        Variables to extract, as ``"name"`` for the root group or
+        ``"group/name"`` for netCDF groups (e.g.
+        ``"product/vertical_column_troposphere"``). Defaults to every
+        root-group variable.
+    drop_variables : list[str], optional
+        Variables to skip, using the same naming.
+    chunks : dict[str, int], optional
+        Out-of-core mode: block size per dimension, e.g.
+        ``{"time": 1, "latitude": 256}``. Granules are opened lazily
+        (dask-backed when dask is installed) and clipped, masked and
+        tabulated one block at a time, so peak memory is set by the chunk
+        size rather than by the granule size.
+    as_arrow : bool
+        Build Arrow record batches straight from the decoded NumPy arrays
+        instead of DataFrames, e.g. for
+        `BigQueryClient.upload_data_from_arrow`.
+    sparse : bool
+        Sparse emit mode: drop NaN/fill cells of `primary_variable` on the
+        NumPy arrays of each granule, so only observed cells become rows.
+        TEMPO granules are mostly fill outside the daylight scan.
+    primary_variable : str, optional
+        Variable whose mask drives `sparse`, by name or as ``"group/name"``
+        (e.g. ``"product/vertical_column_troposphere"`` for TEMPO). It is
+        opened even when not listed in `variables`. Defaults to the first
+        data variable of each granule.
+    """
+
+    variables: Optional[Sequence[str]] = None
+    drop_variables: Optional[Sequence[str]] = None
+    chunks: Optional[Dict[str, int]] = None
+    as_arrow: bool = False
+    sparse: bool = False
+    primary_variable: Optional[str] = None
+
+    def open_kwargs(self) -> Dict:
+        """Return the keyword arguments of `open_granule`."""
+        include = [self.primary_variable] if self.sparse and self.primary_variable else []
+        return dict(
+            variables=self.variables,
+            drop_variables=self.drop_variables,
+            chunks=self.chunks,
+            include=include,
+        )
+
+    def decode_kwargs(self) -> Dict:
+        """Return the keyword arguments of `decode_granule` (besides the polygon)."""
+        return dict(
+            self.open_kwargs(),
+            sparse=self.sparse,
+            primary_variable=self.primary_variable,
+        )
+
+
+DEFAULT_DECODE_OPTIONS = DecodeOptions()
+
+
+def decode_granule(
+    path,
+    polygon: Optional[Polygon] = None,
+    variables: Optional[Sequence[str]] = None,
+    drop_variables: Optional[Sequence[str]] = None,
+    chunks: Optional[Dict[str, int]] = None,
+    sparse: bool = False,
+    primary_variable: Optional[str] = None,
+    **open_kwargs,
+) -> Optional[pa.Buffer]:
+    """Decode a granule file into an Arrow IPC stream.
+
+    Runs the whole open, clip, mask and tabulate path and serializes the
+    result as one record batch per block. It is a module-level function so
+    it can run in a worker process; the IPC buffer is returned to the parent
+    in one piece instead of as a pickled DataFrame.
+
+    Returns
+    -------
+    pyarrow.Buffer or None
+        The IPC stream, or None if the file has no rows inside `polygon`.
+
+    Raises
+    ------
+    OSError, ValueError, RuntimeError, TypeError
+        If the file cannot be opened; the caller decides whether to skip it.
+    """
+    ds = open_granule(
+        path,
+        variables=variables,
+        drop_variables=drop_variables,
+        chunks=chunks,
+        **open_kwargs,
+    )
+
+    sink = pa.BufferOutputStream()
+    writer = None
+    try:
+        for batch in dataset_batches(
+            ds, polygon, chunks=chunks, sparse=sparse, primary_variable=primary_variable
+        ):
+            if writer is None:
+                writer = pa.ipc.new_stream(sink, batch.schema)
+            writer.write_batch(batch)
+    finally:
+        ds.close()
+        if writer is not None:
+            writer.close()
+    return sink.getvalue() if writer is not None else None
+
+
+def batches_from_ipc(buffer) -> Iterator[pa.RecordBatch]:
+    """Yield the record batches of an IPC stream from `decode_granule`."""
+    with pa.ipc.open_stream(buffer) as reader:
+        yield from reader
+
+
+def frames_from_ipc(buffer) -> Iterator[pd.DataFrame]:
+    """Yield one DataFrame per record batch of an IPC stream from `decode_granule`."""
+    for batch in batches_from_ipc(buffer):
+        yield batch.to_pandas()
@@ -0,0 +1,156 @@
+"""Geometry helpers shared by the ETL and service code."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+Polygon = Sequence[Tuple[float, float]]
+
+DEFAULT_CHUNK_SIZE = 262_144
+
+
+def polygon_bbox(polygon: Polygon) -> Tuple[float, float, float, float]:
+    """Return the bounding box of a polygon.
+
+    Args:
+        polygon: A sequence of (longitude, latitude) tuples.
+
+    Returns:
+        Tuple[float, float, float, float]: ``(lon_min, lat_min, lon_max, lat_max)``.
+    """
+    lons = [float(p[0]) for p in polygon]
+    lats = [float(p[1]) for p in polygon]
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def _ray_cast(x: np.ndarray, y: np.ndarray, vx: np.ndarray, vy: np.ndarray) -> np.ndarray:
+    """Even-odd ray casting of points against a polygon's edges.
+
+    Loops over the (few) edges and vectorizes over the (many) points: a point
+    is inside when a horizontal ray towards +x crosses an odd number of edges.
+    """
+    inside = np.zeros(x.shape, dtype=bool)
+    for x1, y1, x2, y2 in zip(vx, vy, np.roll(vx, 1), np.roll(vy, 1)):
+        if y1 == y2:
+            # Horizontal (or degenerate closing) edges are never crossed.
+            continue
+        idx = np.flatnonzero((y1 > y) != (y2 > y))
+        x_cross = x1 + (y[idx] - y1) * ((x2 - x1) / (y2 - y1))
+        inside[idx] ^= x[idx] < x_cross
+    return inside
+
+
+def points_in_polygon(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    polygon: Polygon,
+    chunk_size: Optional[int] = DEFAULT_CHUNK_SIZE,
+) -> np.ndarray:
+    """Return a boolean mask of the points lying inside `polygon`.
+
+    Points outside the polygon's bounding box are rejected with a cheap
+    comparison; only the remaining candidates go through ray casting.
+    Work is done in chunks of `chunk_size` points so temporaries stay small
+    on very large inputs.
+
+    Args:
+        lon: Longitudes of the points.
+        lat: Latitudes of the points, same shape as `lon`.
+        polygon: A sequence of (longitude, latitude) tuples. It may be open
+            or closed (first vertex repeated at the end).
+        chunk_size: Number of points processed at a time. ``None`` processes
+            everything in one pass.
+
+    Returns:
+        np.ndarray: Boolean array with the shape of `lon`.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    if lon.shape != lat.shape:
+        raise ValueError("lon and lat must have the same shape.")
+    x, y = lon.reshape(-1), lat.reshape(-1)
+    inside = np.zeros(x.shape, dtype=bool)
+    if x.size == 0 or len(polygon) < 3:
+        return inside.reshape(lon.shape)
+
+    vx = np.array([p[0] for p in polygon], dtype=float)
+    vy = np.array([p[1] for p in polygon], dtype=float)
+    lon_min, lat_min, lon_max, lat_max = polygon_bbox(polygon)
+
+    step = chunk_size or x.size
+    for start in range(0, x.size, step):
+        cx, cy = x[start : start + step], y[start : start + step]
+        candidates = np.flatnonzero(
+            (cx >= lon_min) & (cx <= lon_max) & (cy >= lat_min) & (cy <= lat_max)
+        )
+        if candidates.size:
+            inside[start + candidates] = _ray_cast(
+                cx[candidates], cy[candidates], vx, vy
+            )
+    return inside.reshape(lon.shape)
+
+
+class GridMaskCache:
+    """Process-wide cache of polygon masks for fixed lat/lon grids.
+
+    Gridded products such as TEMPO_NO2_L3 or MERRA-2 share the same grid in
+    every granule, so whether a cell lies inside a polygon never changes.
+    Masks are computed once per ``(grid, polygon)`` pair and reused, turning
+    per-row point-in-polygon tests into a single array lookup.
+
+    Args:
+        max_entries: Maximum number of masks kept; the least recently used
+            mask is dropped beyond it.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._masks: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(lat: np.ndarray, lon: np.ndarray, polygon: Polygon) -> tuple:
+        digest = hashlib.blake2b(digest_size=16)
+        for axis in (lat, lon):
+            axis = np.ascontiguousarray(axis, dtype=np.float64)
+            digest.update(str(axis.shape).encode())
+            digest.update(axis.tobytes())
+        return digest.hexdigest(), tuple((float(x), float(y)) for x, y in polygon)
+
+    def get(self, lat: np.ndarray, lon: np.ndarray, polygon: Polygon) -> np.ndarray:
+        """Return the ``(lat.size, lon.size)`` inside/outside mask of a grid.
+
+        Args:
+            lat: 1-D latitude coordinate of the grid.
+            lon: 1-D longitude coordinate of the grid.
+            polygon: A sequence of (longitude, latitude) tuples.
+
+        Returns:
+            np.ndarray: Read-only boolean mask, ``True`` for cells inside the
+            polygon.
+        """
+        key = self._key(lat, lon, polygon)
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+
+        lon_grid, lat_grid = np.meshgrid(lon, lat)
+        mask = points_in_polygon(lon_grid, lat_grid, polygon)
+        mask.setflags(write=False)
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.max_entries:
+                self._masks.popitem(last=False)
+        return mask
+
+    def clear(self) -> None:
+        """Drop every cached mask."""
+        with self._lock:
+            self._masks.clear()
+
+
+grid_masks = GridMaskCache()
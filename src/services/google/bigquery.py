@@ -1,10 +1,21 @@
 from pathlib import Path
 import os
-from typing import Union
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from google.cloud import bigquery
 from dotenv import load_dotenv
 
+try:
+    import db_dtypes
+except ImportError:  # Only needed for DATE/TIME columns, as in to_dataframe.
+    db_dtypes = None
+
+from src.services.google.cache import QueryCache, is_deterministic
 from src.services.utils import get_logger
 
 load_dotenv()
@@ -12,6 +23,602 @@ load_dotenv()
 logger = get_logger()
 
 
+def _is_not_found(error: Exception) -> bool:
+    return "Not found" in str(error) or getattr(error, "code", None) == 404
+
+
+def _is_conflict(error: Exception) -> bool:
+    return "Already Exists" in str(error) or getattr(error, "code", None) == 409
+
+
+class MetadataCache:
+    """
+    Process-wide cache of the BigQuery datasets and tables known to exist.
+
+    Uploads used to call `get_dataset` (and possibly `create_dataset`) every
+    time; with per-granule or per-day uploads that is thousands of metadata
+    round trips per backfill. Entries are keyed by ``(project, dataset)``
+    and ``(project, dataset, table)``; tables keep the `bigquery.Table`
+    (and therefore the schema) last fetched.
+
+    The cache is shared by every `BigQueryClient` of the process and is
+    thread-safe. `lock` hands out one lock per key so that concurrent
+    uploaders check or create a dataset once instead of racing each other.
+    Entries never expire; call `invalidate` after changing a dataset or a
+    table outside of this process.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._datasets: set = set()
+        self._tables: Dict[tuple, bigquery.Table] = {}
+
+    def lock(self, key: tuple) -> threading.Lock:
+        """Return the lock serializing metadata calls for `key`."""
+        with self._mutex:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def has_dataset(self, project: Optional[str], dataset: str) -> bool:
+        with self._mutex:
+            return (project, dataset) in self._datasets
+
+    def add_dataset(self, project: Optional[str], dataset: str) -> None:
+        with self._mutex:
+            self._datasets.add((project, dataset))
+
+    def get_table(
+        self, project: Optional[str], dataset: str, table_id: str
+    ) -> Optional[bigquery.Table]:
+        with self._mutex:
+            return self._tables.get((project, dataset, table_id))
+
+    def add_table(
+        self, project: Optional[str], dataset: str, table_id: str, table: bigquery.Table
+    ) -> None:
+        with self._mutex:
+            self._datasets.add((project, dataset))
+            self._tables[(project, dataset, table_id)] = table
+
+    def invalidate(
+        self,
+        project: Optional[str] = None,
+        dataset: Optional[str] = None,
+        table_id: Optional[str] = None,
+    ) -> None:
+        """
+        Forget cached metadata.
+
+        With no arguments everything is dropped. With a `dataset` only that
+        dataset (and its tables) is dropped; with a `table_id` as well, only
+        that table.
+        """
+        with self._mutex:
+            if dataset is None:
+                self._datasets.clear()
+                self._tables.clear()
+                return
+            if table_id is None:
+                self._datasets.discard((project, dataset))
+                for key in [k for k in self._tables if k[:2] == (project, dataset)]:
+                    del self._tables[key]
+            else:
+                self._tables.pop((project, dataset, table_id), None)
+
+
+METADATA_CACHE = MetadataCache()
+
+
+# Storage Write API requests are limited to 10 MB; leave room for the envelope.
+MAX_APPEND_BYTES = 8 * 1024**2
+_ALREADY_EXISTS = 6
+
+
+def _bigquery_type(dtype: pa.DataType) -> str:
+    """Return the BigQuery column type for an Arrow type."""
+    if pa.types.is_dictionary(dtype):
+        return _bigquery_type(dtype.value_type)
+    if pa.types.is_boolean(dtype):
+        return "BOOLEAN"
+    if pa.types.is_integer(dtype):
+        return "INTEGER"
+    if pa.types.is_floating(dtype):
+        return "FLOAT"
+    if pa.types.is_decimal(dtype):
+        return "NUMERIC"
+    if pa.types.is_string(dtype) or pa.types.is_large_string(dtype):
+        return "STRING"
+    if pa.types.is_binary(dtype) or pa.types.is_large_binary(dtype):
+        return "BYTES"
+    if pa.types.is_timestamp(dtype):
+        return "TIMESTAMP" if dtype.tz else "DATETIME"
+    if pa.types.is_date(dtype):
+        return "DATE"
+    if pa.types.is_time(dtype):
+        return "TIME"
+    raise ValueError(f"No BigQuery type for Arrow type {dtype}.")
+
+
+def _conform_for_write(table: pa.Table) -> pa.Table:
+    """Cast Arrow columns to the types the Storage Write API accepts.
+
+    Dictionary (categorical) columns are decoded, narrow integers and floats
+    widened to 64 bits and timestamps truncated to microseconds, which is
+    the BigQuery resolution.
+    """
+    fields = []
+    for field in table.schema:
+        dtype = field.type
+        if pa.types.is_dictionary(dtype):
+            dtype = dtype.value_type
+        if pa.types.is_integer(dtype) and dtype != pa.int64():
+            dtype = pa.int64()
+        elif pa.types.is_floating(dtype) and dtype != pa.float64():
+            dtype = pa.float64()
+        elif pa.types.is_timestamp(dtype) and dtype.unit == "ns":
+            dtype = pa.timestamp("us", tz=dtype.tz)
+        elif pa.types.is_large_string(dtype):
+            dtype = pa.string()
+        fields.append(field.with_type(dtype))
+    schema = pa.schema(fields)
+    if schema.equals(table.schema):
+        return table
+    return table.cast(schema, safe=False)
+
+
+class StorageWriteSink:
+    """
+    Append Arrow data to a BigQuery table through the Storage Write API.
+
+    Unlike load jobs, appends are not subject to load-job quotas and have no
+    per-job startup latency, which suits frequent small uploads. Rows are
+    sent as serialized Arrow record batches over a single write stream, with
+    explicit offsets: a request retried after a transport error is
+    recognised by the server (``ALREADY_EXISTS``) instead of being written
+    twice.
+
+    In ``"pending"`` mode (the default) nothing is visible until `commit`,
+    which finalizes the stream and commits it atomically, so a set of
+    batches is loaded exactly once or not at all; `abort` discards it. In
+    ``"committed"`` mode every append is visible as soon as it is
+    acknowledged.
+
+    Used as a context manager the sink commits on success and aborts on an
+    exception::
+
+        with google.bigquery.storage_write_sink("earth_data", "no2") as sink:
+            for batch in batches:
+                sink.write(batch)
+
+    The table is created from the first batch's schema if it does not exist.
+    Requires the ``google-cloud-bigquery-storage`` package unless a
+    `write_client` is given (e.g. a fake in local tests).
+
+    Attributes:
+        rows: Number of rows acknowledged by the server.
+        committed: Whether the rows were committed.
+    """
+
+    def __init__(
+        self,
+        client: "BigQueryClient",
+        dataset: str,
+        table_id: str,
+        mode: str = "pending",
+        write_client=None,
+        max_request_bytes: int = MAX_APPEND_BYTES,
+        max_retries: int = 3,
+    ):
+        if mode not in ("pending", "committed"):
+            raise ValueError(f"Unknown write mode {mode!r}; expected 'pending' or 'committed'.")
+        try:
+            from google.cloud import bigquery_storage_v1
+            from google.cloud.bigquery_storage_v1 import types
+        except ImportError as e:
+            raise ImportError(
+                "StorageWriteSink requires google-cloud-bigquery-storage "
+                "(pip install google-cloud-bigquery-storage)."
+            ) from e
+        self._types = types
+        self.client = client
+        self.dataset = dataset
+        self.table_id = table_id
+        self.mode = mode
+        self.write_client = write_client or bigquery_storage_v1.BigQueryWriteClient()
+        self.max_request_bytes = max_request_bytes
+        self.max_retries = max_retries
+        self.rows = 0
+        self.committed = False
+        self._parent = self.write_client.table_path(
+            client.project_id or client.client.project, dataset, table_id
+        )
+        self._stream: Optional[str] = None
+        self._schema: Optional[pa.Schema] = None
+        self._closed = False
+
+    def __enter__(self) -> "StorageWriteSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def write(
+        self, data: Union[pd.DataFrame, pa.Table, pa.RecordBatch, Iterable[pa.RecordBatch]]
+    ) -> None:
+        """
+        Append rows to the write stream.
+
+        Args:
+            data: A DataFrame, a pyarrow Table, a RecordBatch or an iterable
+                of RecordBatches, with the same columns as the first write.
+        """
+        if self._closed:
+            raise RuntimeError("Cannot write to a closed StorageWriteSink.")
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, preserve_index=False)
+        elif isinstance(data, pa.RecordBatch):
+            data = pa.Table.from_batches([data])
+        elif not isinstance(data, pa.Table):
+            for batch in data:
+                self.write(batch)
+            return
+        if data.num_rows == 0:
+            return
+
+        table = _conform_for_write(data.replace_schema_metadata(None))
+        if self._schema is None:
+            self._open(table.schema)
+        table = table.select(self._schema.names).cast(self._schema)
+        self._append(self._split(table))
+
+    def commit(self) -> int:
+        """
+        Finalize the stream and make its rows visible.
+
+        In pending mode all rows are committed atomically; in committed mode
+        they already are and the stream is only finalized.
+
+        Returns:
+            int: The number of rows written.
+        """
+        if self._closed:
+            return self.rows
+        self._closed = True
+        if self._stream is None:
+            return 0
+        self.write_client.finalize_write_stream(name=self._stream)
+        if self.mode == "pending":
+            response = self.write_client.batch_commit_write_streams(
+                request=self._types.BatchCommitWriteStreamsRequest(
+                    parent=self._parent, write_streams=[self._stream]
+                )
+            )
+            if getattr(response, "stream_errors", None):
+                raise RuntimeError(
+                    f"Failed to commit write stream {self._stream}: {list(response.stream_errors)}"
+                )
+        self.committed = True
+        logger.info(
+            f"Committed {self.rows} rows to {self.dataset}.{self.table_id} through the Storage Write API."
+        )
+        return self.rows
+
+    def abort(self) -> None:
+        """Finalize the stream without committing it (pending rows are discarded)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._stream is not None:
+            self.write_client.finalize_write_stream(name=self._stream)
+            logger.warning(
+                f"Aborted write stream {self._stream} ({self.rows} rows"
+                f"{' discarded' if self.mode == 'pending' else ' already visible'})."
+            )
+
+    def _open(self, schema: pa.Schema) -> None:
+        self.client._ensure_table(self.dataset, self.table_id, schema)
+        stream_type = (
+            self._types.WriteStream.Type.PENDING
+            if self.mode == "pending"
+            else self._types.WriteStream.Type.COMMITTED
+        )
+        stream = self.write_client.create_write_stream(
+            parent=self._parent, write_stream=self._types.WriteStream(type_=stream_type)
+        )
+        self._stream = stream.name
+        self._schema = schema
+
+    def _split(self, table: pa.Table) -> List[pa.RecordBatch]:
+        # Keep each request under the API's size limit.
+        rows_per_request = max(
+            int(table.num_rows * self.max_request_bytes / max(table.nbytes, 1)), 1
+        )
+        return table.to_batches(max_chunksize=rows_per_request)
+
+    def _requests(self, batches: List[pa.RecordBatch], offset: int):
+        types = self._types
+        for i, batch in enumerate(batches):
+            rows = types.ArrowRecordBatch(
+                serialized_record_batch=batch.serialize().to_pybytes(),
+                row_count=batch.num_rows,
+            )
+            if i == 0:
+                # The first request of a connection names the stream and schema.
+                schema = types.ArrowSchema(
+                    serialized_schema=self._schema.serialize().to_pybytes()
+                )
+                yield types.AppendRowsRequest(
+                    write_stream=self._stream,
+                    offset=offset,
+                    arrow_rows=types.AppendRowsRequest.ArrowData(
+                        writer_schema=schema, rows=rows
+                    ),
+                )
+            else:
+                yield types.AppendRowsRequest(
+                    offset=offset, arrow_rows=types.AppendRowsRequest.ArrowData(rows=rows)
+                )
+            offset += batch.num_rows
+
+    def _append(self, batches: List[pa.RecordBatch]) -> None:
+        attempt = 0
+        while batches:
+            try:
+                responses = self.write_client.append_rows(
+                    requests=self._requests(list(batches), self.rows),
+                    # The stream is only named in the first request, so the
+                    # routing header has to carry it for the backend.
+                    metadata=(("x-goog-request-params", f"write_stream={self._stream}"),),
+                )
+                for response in responses:
+                    self._check(response)
+                    self.rows += batches.pop(0).num_rows
+            except RuntimeError:
+                raise
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(
+                    f"Append to {self._stream} failed ({e}); retrying from offset {self.rows}."
+                )
+                time.sleep(min(2**attempt, 30))
+
+    @staticmethod
+    def _check(response) -> None:
+        error = getattr(response, "error", None)
+        code = getattr(error, "code", 0) if error is not None else 0
+        # ALREADY_EXISTS: the rows at this offset were written by an earlier attempt.
+        if code and code != _ALREADY_EXISTS:
+            raise RuntimeError(f"Storage Write API append failed: {error.message}")
+        if getattr(response, "row_errors", None):
+            raise RuntimeError(f"Storage Write API rejected rows: {list(response.row_errors)}")
+
+
+def _fits_ns(column: pa.ChunkedArray) -> bool:
+    """Return whether a date/timestamp column fits pandas' nanosecond range."""
+    try:
+        column.cast(pa.timestamp("ns"))
+    except pa.ArrowInvalid:
+        return False
+    return True
+
+
+def _arrow_to_dataframe(table: pa.Table) -> pd.DataFrame:
+    """Convert a query result to pandas like `RowIterator.to_dataframe`.
+
+    Uses the BigQuery client's default dtypes: BOOL and INT64 columns become
+    the nullable ``boolean`` / ``Int64`` dtypes, DATE and TIME columns the
+    ``dbdate`` / ``dbtime`` dtypes of db-dtypes, and DATE or TIMESTAMP
+    columns holding values outside the nanosecond range stay Python objects.
+    Cached and fresh results therefore come back with the same dtypes.
+    """
+    date_as_object = not all(
+        _fits_ns(column) for column in table.columns if pa.types.is_date(column.type)
+    )
+    timestamp_as_object = not all(
+        _fits_ns(column) for column in table.columns if pa.types.is_timestamp(column.type)
+    )
+
+    def types_mapper(arrow_type: pa.DataType):
+        if pa.types.is_boolean(arrow_type):
+            return pd.BooleanDtype()
+        if pa.types.is_int64(arrow_type):
+            return pd.Int64Dtype()
+        if db_dtypes is not None:
+            if pa.types.is_date32(arrow_type) and not date_as_object:
+                return db_dtypes.DateDtype()
+            if pa.types.is_time(arrow_type):
+                return db_dtypes.TimeDtype()
+        return None
+
+    return table.to_pandas(
+        date_as_object=date_as_object,
+        timestamp_as_object=timestamp_as_object,
+        integer_object_nulls=True,
+        types_mapper=types_mapper,
+    )
+
+
+Frames = Union[pd.DataFrame, pa.Table, pa.RecordBatch]
+
+
+class UploadBuffer:
+    """
+    Coalesce many small frames into few large BigQuery load jobs.
+
+    Frames (or Arrow tables/record batches) are accumulated and uploaded as
+    one load job when the buffer holds at least `max_rows` rows or
+    `max_bytes` bytes, or when its oldest row has waited `max_seconds`.
+    Thresholds are checked on every `write`, and `close` (or leaving the
+    context manager) flushes whatever is left. Fewer, larger jobs are much
+    faster than one per granule and stay clear of the daily load-job quota.
+
+    The first write fixes the buffer's kind: DataFrames are uploaded with
+    `upload_data_from_dataframe`, Arrow data with `upload_data_from_arrow`;
+    later writes of the other kind are converted. Pass `upload` to replace
+    the upload (it receives the concatenated DataFrame or Table), e.g. to
+    re-apply dtypes or use another client, and `on_flush` to be called after
+    each successful upload.
+
+    Attributes:
+        flushes: Number of uploads.
+        rows: Number of rows uploaded.
+        bytes: In-memory size of the data uploaded.
+        upload_seconds: Time spent in uploads.
+    """
+
+    def __init__(
+        self,
+        client: Optional["BigQueryClient"] = None,
+        dataset: Optional[str] = None,
+        table_id: Optional[str] = None,
+        max_rows: Optional[int] = 5_000_000,
+        max_bytes: Optional[int] = 512 * 1024**2,
+        max_seconds: Optional[float] = None,
+        upload: Optional[Callable[[Union[pd.DataFrame, pa.Table]], Any]] = None,
+        on_flush: Optional[Callable[[], Any]] = None,
+    ):
+        if upload is None and (client is None or not dataset or not table_id):
+            raise ValueError("UploadBuffer needs a client, dataset and table_id, or an upload callable.")
+        self.client = client
+        self.dataset = dataset
+        self.table_id = table_id
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.upload = upload
+        self.on_flush = on_flush
+        self.flushes = 0
+        self.rows = 0
+        self.bytes = 0
+        self.upload_seconds = 0.0
+        self._frames: List[Union[pd.DataFrame, pa.Table]] = []
+        self._arrow: Optional[bool] = None
+        self._pending_rows = 0
+        self._pending_bytes = 0
+        self._since: Optional[float] = None
+
+    def __enter__(self) -> "UploadBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # Keep the rows produced before the error, without masking it.
+        try:
+            self.close()
+        except Exception as e:
+            logger.error(f"Failed to flush {self._pending_rows} buffered rows: {e}")
+
+    @property
+    def pending_rows(self) -> int:
+        """Number of rows waiting to be uploaded."""
+        return self._pending_rows
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Flush statistics."""
+        return {
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "upload_seconds": self.upload_seconds,
+            "pending_rows": self._pending_rows,
+        }
+
+    def write(self, data: Union[Frames, Iterable[Frames]]) -> None:
+        """
+        Buffer rows and flush if a threshold is crossed.
+
+        Args:
+            data: A DataFrame, Table or RecordBatch, or a list of them. The
+                thresholds are checked once all of them are buffered, so a
+                list is never split across uploads.
+        """
+        for frame in [data] if isinstance(data, (pd.DataFrame, pa.Table, pa.RecordBatch)) else data:
+            self._add(frame)
+        if self._should_flush():
+            self.flush()
+
+    def flush(self) -> None:
+        """Upload the buffered rows as one load job."""
+        if not self._frames:
+            self._since = None
+            return
+        if self._arrow:
+            data = pa.concat_tables(self._frames, promote_options="permissive")
+        else:
+            data = pd.concat(self._frames, axis=0, ignore_index=True, copy=False)
+        rows, size = self._pending_rows, self._pending_bytes
+
+        started = time.monotonic()
+        if self.upload is not None:
+            self.upload(data)
+        elif self._arrow:
+            self.client.upload_data_from_arrow(data, self.dataset, self.table_id)
+        else:
+            self.client.upload_data_from_dataframe(data, self.dataset, self.table_id)
+        elapsed = time.monotonic() - started
+
+        self._frames.clear()
+        self._pending_rows = 0
+        self._pending_bytes = 0
+        self._since = None
+        self.flushes += 1
+        self.rows += rows
+        self.bytes += size
+        self.upload_seconds += elapsed
+        logger.info(f"Flushed {rows:,} rows in {elapsed:.1f}s (flush {self.flushes}).")
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Flush the remaining rows and return the flush statistics.
+
+        Returns:
+            dict: See `stats`.
+        """
+        self.flush()
+        return self.stats
+
+    def _add(self, frame: Frames) -> None:
+        if isinstance(frame, pa.RecordBatch):
+            frame = pa.Table.from_batches([frame])
+        is_arrow = isinstance(frame, pa.Table)
+        if len(frame) == 0:
+            return
+        if self._arrow is None:
+            self._arrow = is_arrow
+        if self._arrow and not is_arrow:
+            frame = pa.Table.from_pandas(frame, preserve_index=False)
+        elif not self._arrow and is_arrow:
+            frame = frame.to_pandas()
+        size = frame.nbytes if self._arrow else int(frame.memory_usage(index=False).sum())
+        self._frames.append(frame)
+        self._pending_rows += len(frame)
+        self._pending_bytes += size
+        if self._since is None:
+            self._since = time.monotonic()
+
+    def _should_flush(self) -> bool:
+        if not self._frames:
+            return False
+        if self.max_rows is not None and self._pending_rows >= self.max_rows:
+            return True
+        if self.max_bytes is not None and self._pending_bytes >= self.max_bytes:
+            return True
+        return (
+            self.max_seconds is not None
+            and time.monotonic() - self._since >= self.max_seconds
+        )
+
+
 class BigQueryClient:
     """
     A client for interacting with Google BigQuery.
@@ -40,79 +647,467 @@ class BigQueryClient:
             self.client: bigquery.Client = bigquery.Client(location=self.location)
             self.project_id = getattr(self.client, "project", None)
 
+        # Opt-in result cache for get_data (BIGQUERY_CACHE_DIR).
+        self.query_cache: Optional[QueryCache] = QueryCache.from_env()
+
         logger.info(
             f"BigQuery client initialized (project={self.project_id}, location={self.location})"
         )
 
-    def get_data(self, query: Union[str, Path]) -> pd.DataFrame:
+    @staticmethod
+    def _read_sql(query: Union[str, Path]) -> str:
+        """Return the SQL of a query string or of a path to a .sql file."""
+        if isinstance(query, (str, Path)) and Path(query).exists():
+            with open(query, "r", encoding="utf-8") as f:
+                return f.read()
+        return str(query)
+
+    def get_data(self, query: Union[str, Path], use_cache: bool = True) -> pd.DataFrame:
         """
         Execute a BigQuery query and return the results as a pandas DataFrame.
 
+        When a query cache is configured (`BIGQUERY_CACHE_DIR`), results are
+        reused for as long as none of the tables the query reads has been
+        modified. Queries using non-deterministic functions (e.g.
+        ``CURRENT_DATE``) or ``TABLESAMPLE``, or reading tables with a
+        streaming buffer, are not cached.
+
         Args:
             query: Either a SQL query string or a path to a .sql file.
+            use_cache: Set to False to bypass the query cache.
 
         Returns:
             pd.DataFrame: The query results.
         """
-        if isinstance(query, str) and Path(query).exists():
-            with open(query, "r", encoding="utf-8") as f:
-                sql = f.read()
-        else:
-            sql = str(query)
+        sql = self._read_sql(query)
+        cache = self.query_cache if use_cache else None
+        key = self._query_cache_key(sql) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info(f"Query cache hit ({cached.num_rows} rows).")
+                return _arrow_to_dataframe(cached)
 
         query_job = self.client.query(sql)
         results = query_job.result()
-        df = results.to_dataframe()
-        return df
+        if key is None:
+            return results.to_dataframe()
 
-    def upload_data_from_dataframe(self, df: pd.DataFrame, dataset: str, table_id: str):
+        # Cache the Arrow result and convert it the same way on hits and
+        # misses, so callers see the same dtypes either way.
+        table = results.to_arrow()
+        try:
+            cache.put(key, table)
+        except Exception as e:
+            logger.warning(f"Could not cache query results: {e}")
+        return _arrow_to_dataframe(table)
+
+    def _query_cache_key(self, sql: str) -> Optional[str]:
         """
-        Upload a pandas DataFrame to a specified BigQuery table.
+        Return the query cache key of `sql`, or None if it must not be cached.
 
-        Args:
-            df: The pandas DataFrame to upload.
-            dataset: The BigQuery dataset name.
-            table_id: The BigQuery table ID in the format `dataset.table`.
+        The referenced tables come from a (free) dry run; their last-modified
+        times are read fresh, bypassing `METADATA_CACHE`.
         """
-        # Ensure the dataset exists. Use the client's notion of project when possible.
+        if not is_deterministic(sql):
+            return None
         try:
-            dataset_ref = self.client.dataset(dataset)
-            self.client.get_dataset(dataset_ref)
-            logger.info(
-                f"Dataset {dataset} already exists (project={self.project_id})."
+            dry_run = self.client.query(
+                sql, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
             )
+            versions = {}
+            for ref in dry_run.referenced_tables or []:
+                table = self.client.get_table(ref)
+                if table.streaming_buffer is not None or table.modified is None:
+                    # Rows still arriving; the modified time does not track them.
+                    return None
+                versions[f"{ref.project}.{ref.dataset_id}.{ref.table_id}"] = table.modified.isoformat()
         except Exception as e:
-            # If dataset missing, create it in the configured location
-            if "Not found" in str(e) or getattr(e, "code", None) == 404:
-                dataset_obj = bigquery.Dataset(dataset_ref)
-                dataset_obj.location = self.location
-                self.client.create_dataset(dataset_obj)
+            logger.warning(f"Query cache disabled for this query: {e}")
+            return None
+        return QueryCache.key(sql, versions, project=self.project_id)
+
+    def iter_batches(
+        self,
+        query: Union[str, Path],
+        columns: Optional[Sequence[str]] = None,
+        max_streams: int = 4,
+        max_queue: int = 16,
+        read_client=None,
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Execute a query and stream its results as Arrow record batches.
+
+        The query runs as usual and its result table is then read with the
+        BigQuery Storage Read API over up to `max_streams` parallel streams,
+        one thread per stream. Batches go through a queue of `max_queue`
+        batches, so memory stays bounded however large the result is, while
+        reads proceed at multi-stream throughput.
+
+        Batches from different streams are interleaved: the query's ORDER BY
+        is only preserved with ``max_streams=1``. Stopping the iteration
+        early stops the readers.
+
+        Requires the ``google-cloud-bigquery-storage`` package unless a
+        `read_client` is given.
+
+        Args:
+            query: Either a SQL query string or a path to a .sql file.
+            columns: Columns of the result to read, or None for all of them.
+            max_streams: Maximum number of parallel read streams.
+            max_queue: Maximum number of batches buffered ahead of the consumer.
+            read_client: A `BigQueryReadClient` (or a stand-in for tests).
+
+        Yields:
+            pa.RecordBatch: The result rows.
+        """
+        try:
+            from google.cloud import bigquery_storage_v1
+            from google.cloud.bigquery_storage_v1 import types
+        except ImportError as e:
+            raise ImportError(
+                "iter_batches requires google-cloud-bigquery-storage "
+                "(pip install google-cloud-bigquery-storage)."
+            ) from e
+        if read_client is None:
+            read_client = bigquery_storage_v1.BigQueryReadClient()
+
+        query_job = self.client.query(self._read_sql(query))
+        query_job.result()
+        table = query_job.destination
+        read_options = types.ReadSession.TableReadOptions(
+            selected_fields=list(columns) if columns else []
+        )
+        session = read_client.create_read_session(
+            parent=f"projects/{self.project_id or self.client.project}",
+            read_session=types.ReadSession(
+                table=f"projects/{table.project}/datasets/{table.dataset_id}/tables/{table.table_id}",
+                data_format=types.DataFormat.ARROW,
+                read_options=read_options,
+            ),
+            max_stream_count=max(int(max_streams), 1),
+        )
+        streams = list(session.streams)
+        if not streams:
+            return
+        logger.info(f"Reading query results over {len(streams)} streams.")
+
+        batches: "queue.Queue" = queue.Queue(maxsize=max(int(max_queue), 1))
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read(stream) -> None:
+            try:
+                for page in read_client.read_rows(stream.name).rows(session).pages:
+                    if not put(page.to_arrow()):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        readers = [
+            threading.Thread(target=read, args=(stream,), daemon=True) for stream in streams
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            remaining = len(readers)
+            while remaining:
+                item = batches.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                elif item.num_rows:
+                    yield item
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+
+    def _ensure_dataset(self, dataset: str) -> None:
+        """
+        Create a dataset in the configured location if it does not exist.
+
+        Datasets known to exist are remembered in `METADATA_CACHE`, so this
+        costs a metadata call only the first time per process. Concurrent
+        callers in the process wait for the first check, and a dataset
+        created concurrently by another process is treated as existing.
+
+        Args:
+            dataset: The BigQuery dataset name.
+        """
+        if METADATA_CACHE.has_dataset(self.project_id, dataset):
+            return
+        with METADATA_CACHE.lock((self.project_id, dataset)):
+            if METADATA_CACHE.has_dataset(self.project_id, dataset):
+                return
+            # Ensure the dataset exists. Use the client's notion of project when possible.
+            dataset_ref = self.client.dataset(dataset)
+            try:
+                self.client.get_dataset(dataset_ref)
                 logger.info(
-                    f"Created dataset {dataset} in location {self.location} (project={self.project_id})."
+                    f"Dataset {dataset} already exists (project={self.project_id})."
                 )
-            else:
-                logger.error(f"Error checking/creating dataset: {e}")
+            except Exception as e:
+                # If dataset missing, create it in the configured location
+                if not _is_not_found(e):
+                    logger.error(f"Error checking/creating dataset: {e}")
+                    raise
+                dataset_obj = bigquery.Dataset(dataset_ref)
+                dataset_obj.location = self.location
+                try:
+                    self.client.create_dataset(dataset_obj)
+                    logger.info(
+                        f"Created dataset {dataset} in location {self.location} (project={self.project_id})."
+                    )
+                except Exception as create_error:
+                    # Another process created it between our check and create.
+                    if not _is_conflict(create_error):
+                        logger.error(f"Error checking/creating dataset: {create_error}")
+                        raise
+                    logger.info(f"Dataset {dataset} was created concurrently.")
+            METADATA_CACHE.add_dataset(self.project_id, dataset)
+
+    def get_table(self, dataset: str, table_id: str) -> Optional[bigquery.Table]:
+        """
+        Return a table's metadata (including its schema), or None if it does not exist.
+
+        Tables are cached in `METADATA_CACHE`; missing tables are not.
+
+        Args:
+            dataset: The BigQuery dataset name.
+            table_id: The BigQuery table name.
+
+        Returns:
+            bigquery.Table: The table, or None.
+        """
+        table = METADATA_CACHE.get_table(self.project_id, dataset, table_id)
+        if table is not None:
+            return table
+        with METADATA_CACHE.lock((self.project_id, dataset, table_id)):
+            table = METADATA_CACHE.get_table(self.project_id, dataset, table_id)
+            if table is not None:
+                return table
+            try:
+                table = self.client.get_table(self._destination(dataset, table_id))
+            except Exception as e:
+                if _is_not_found(e):
+                    return None
                 raise
+            METADATA_CACHE.add_table(self.project_id, dataset, table_id, table)
+            return table
+
+    def invalidate_metadata(
+        self, dataset: Optional[str] = None, table_id: Optional[str] = None
+    ) -> None:
+        """
+        Drop cached dataset/table metadata of this client's project.
+
+        Args:
+            dataset: Dataset to forget, or None for everything cached.
+            table_id: Table of `dataset` to forget, or None for the whole dataset.
+        """
+        if dataset is None:
+            METADATA_CACHE.invalidate()
+        else:
+            METADATA_CACHE.invalidate(self.project_id, dataset, table_id)
+
+    def _ensure_table(self, dataset: str, table_id: str, schema: pa.Schema) -> bigquery.Table:
+        """
+        Return a table, creating it from an Arrow schema if it does not exist.
+
+        Args:
+            dataset: The BigQuery dataset name.
+            table_id: The BigQuery table name.
+            schema: Arrow schema of the rows to be written.
+        """
+        table = self.get_table(dataset, table_id)
+        if table is not None:
+            return table
+        self._ensure_dataset(dataset)
+        fields = [
+            bigquery.SchemaField(field.name, _bigquery_type(field.type))
+            for field in schema
+        ]
+        table = self.client.create_table(
+            bigquery.Table(self._destination(dataset, table_id), schema=fields),
+            exists_ok=True,
+        )
+        logger.info(f"Created table {dataset}.{table_id} (project={self.project_id}).")
+        METADATA_CACHE.add_table(self.project_id, dataset, table_id, table)
+        return table
+
+    def _destination(self, dataset: str, table_id: str) -> str:
+        """Return the fully qualified table name for a load job."""
+        # Build destination; if project_id is None, let client infer it by using dataset.table
+        if self.project_id:
+            return f"{self.project_id}.{dataset}.{table_id}"
+        return f"{dataset}.{table_id}"
 
+    def _load_job_config(self, **kwargs) -> bigquery.LoadJobConfig:
+        """Return the append/create-if-needed load configuration."""
         # Append by default to avoid overwriting existing table contents.
         # Use CREATE_IF_NEEDED to allow creating the table when it doesn't exist.
         job_config = bigquery.LoadJobConfig(
             write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
             create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED,
+            **kwargs,
         )
         logger.info("BigQuery load configured to WRITE_APPEND and CREATE_IF_NEEDED")
-        # Build destination; if project_id is None, let client infer it by using dataset.table
-        if self.project_id:
-            destination = f"{self.project_id}.{dataset}.{table_id}"
-        else:
-            destination = f"{dataset}.{table_id}"
+        return job_config
 
-        load_job = self.client.load_table_from_dataframe(
-            df, destination, job_config=job_config
+    def _wait_for_load(self, load_job, dataset: str, table_id: str) -> None:
+        """
+        Wait for a load job and log its outcome.
+
+        Cached table metadata is only dropped when the load can have changed
+        it: the table was not cached (the load may create it), or the job
+        replaces the table or updates its schema. Plain appends to a cached
+        table keep it cached.
+        """
+        cached = METADATA_CACHE.get_table(self.project_id, dataset, table_id) is not None
+        reshapes = bool(load_job.schema_update_options) or (
+            load_job.write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE
         )
-        result = load_job.result()
+        try:
+            result = load_job.result()
+        finally:
+            if reshapes or not cached:
+                METADATA_CACHE.invalidate(self.project_id, dataset, table_id)
         if result.errors:
             for error in result.errors:
                 logger.error(f"Error uploading data to BigQuery: {error}")
         else:
             logger.info("Data uploaded successfully.")
+
+    def upload_data_from_dataframe(self, df: pd.DataFrame, dataset: str, table_id: str):
+        """
+        Upload a pandas DataFrame to a specified BigQuery table.
+
+        Args:
+            df: The pandas DataFrame to upload.
+            dataset: The BigQuery dataset name.
+            table_id: The BigQuery table ID in the format `dataset.table`.
+        """
+        self._ensure_dataset(dataset)
+        load_job = self.client.load_table_from_dataframe(
+            df, self._destination(dataset, table_id), job_config=self._load_job_config()
+        )
+        self._wait_for_load(load_job, dataset, table_id)
+
+    def upload_data_from_arrow(
+        self,
+        data: Union[pa.Table, pa.RecordBatch, Iterable[pa.RecordBatch]],
+        dataset: str,
+        table_id: str,
+    ):
+        """
+        Upload Arrow data to a specified BigQuery table.
+
+        The data is written once, as Parquet, into an in-memory buffer that is
+        sent as the load job's source. Unlike `upload_data_from_dataframe`
+        there is no pandas round trip. Record batches from an iterable (e.g.
+        `EarthDataClient.iter_frames` with ``DecodeOptions(as_arrow=True)``)
+        are streamed into the buffer one at a time; they must all share the
+        first batch's schema.
+
+        Args:
+            data: A pyarrow Table, a RecordBatch or an iterable of RecordBatches.
+            dataset: The BigQuery dataset name.
+            table_id: The BigQuery table ID in the format `dataset.table`.
+        """
+        if isinstance(data, pa.RecordBatch):
+            data = pa.Table.from_batches([data])
+
+        sink = pa.BufferOutputStream()
+        if isinstance(data, pa.Table):
+            if data.num_rows == 0:
+                logger.warning("No rows to upload.")
+                return
+            pq.write_table(data, sink)
+        else:
+            writer = None
+            try:
+                for batch in data:
+                    if writer is None:
+                        writer = pq.ParquetWriter(sink, batch.schema)
+                    writer.write_batch(batch)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                logger.warning("No rows to upload.")
+                return
+
+        self._ensure_dataset(dataset)
+        job_config = self._load_job_config(source_format=bigquery.SourceFormat.PARQUET)
+        load_job = self.client.load_table_from_file(
+            pa.BufferReader(sink.getvalue()),
+            self._destination(dataset, table_id),
+            job_config=job_config,
+        )
+        self._wait_for_load(load_job, dataset, table_id)
+
+    def storage_write_sink(
+        self, dataset: str, table_id: str, mode: str = "pending", **kwargs
+    ) -> StorageWriteSink:
+        """
+        Return a `StorageWriteSink` appending to a table.
+
+        Args:
+            dataset: The BigQuery dataset name.
+            table_id: The BigQuery table name.
+            mode: ``"pending"`` (exactly-once commit of everything written)
+                or ``"committed"`` (rows visible as soon as appended).
+            **kwargs: Passed to `StorageWriteSink`.
+        """
+        return StorageWriteSink(self, dataset, table_id, mode=mode, **kwargs)
+
+    def upload_buffer(self, dataset: str, table_id: str, **kwargs) -> UploadBuffer:
+        """
+        Return an `UploadBuffer` coalescing uploads to a table into few load jobs.
+
+        Args:
+            dataset: The BigQuery dataset name.
+            table_id: The BigQuery table name.
+            **kwargs: Thresholds and hooks passed to `UploadBuffer`.
+        """
+        return UploadBuffer(self, dataset, table_id, **kwargs)
+
+    def upload_data_storage_write(
+        self,
+        data: Union[pd.DataFrame, pa.Table, pa.RecordBatch, Iterable[pa.RecordBatch]],
+        dataset: str,
+        table_id: str,
+        **kwargs,
+    ) -> int:
+        """
+        Upload data through the Storage Write API and commit it atomically.
+
+        An alternative to `upload_data_from_dataframe` / `upload_data_from_arrow`
+        without load jobs, for frequent small uploads.
+
+        Args:
+            data: A DataFrame, a pyarrow Table, a RecordBatch or an iterable of RecordBatches.
+            dataset: The BigQuery dataset name.
+            table_id: The BigQuery table name.
+            **kwargs: Passed to `StorageWriteSink`.
+
+        Returns:
+            int: The number of rows committed.
+        """
+        with self.storage_write_sink(dataset, table_id, **kwargs) as sink:
+            sink.write(data)
+        return sink.rows
+
@@ -0,0 +1,177 @@
+"""src/services/google/cache.py: On-disk cache of BigQuery query results."""
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.services.cache import LRUDiskCache
+
+DEFAULT_MAX_BYTES = 5 * 1024**3
+_SUFFIX = ".parquet"
+
+# Strings and quoted identifiers are kept verbatim; comments are dropped and
+# runs of whitespace outside them collapsed.
+_SQL_TOKENS = re.compile(
+    r"""('(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*"|`[^`]*`)|(--[^\n]*|#[^\n]*|/\*.*?\*/)|(\s+)""",
+    re.DOTALL,
+)
+# Constructs whose result changes between runs of the same SQL. The
+# CURRENT_* functions may be called without parentheses, and TABLESAMPLE
+# reads a different sample of the table on every run.
+_NONDETERMINISTIC = re.compile(
+    r"\b(?:CURRENT_(?:DATE|DATETIME|TIME|TIMESTAMP)\b"
+    r"|(?:RAND|GENERATE_UUID|SESSION_USER)\s*\("
+    r"|TABLESAMPLE\b)",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Return a canonical form of a query for use as a cache key.
+
+    Comments are removed, whitespace outside string literals is collapsed and
+    trailing semicolons are dropped, so formatting-only edits of a query (or
+    of its .sql file) still hit the cache.
+
+    Args:
+        sql: The query text.
+
+    Returns:
+        str: The normalized query.
+    """
+
+    def replace(match: re.Match) -> str:
+        if match.group(1) is not None:
+            return match.group(1)
+        return " "
+
+    # Second pass merges the whitespace left around removed comments.
+    sql = _SQL_TOKENS.sub(replace, _SQL_TOKENS.sub(replace, sql))
+    return sql.strip().rstrip(";").strip()
+
+
+def is_deterministic(sql: str) -> bool:
+    """Return whether a query's result only depends on the tables it reads."""
+    # Blank out literals so e.g. 'RAND(' inside a string does not count.
+    code = _SQL_TOKENS.sub(lambda m: "''" if m.group(1) is not None else " ", sql)
+    return _NONDETERMINISTIC.search(code) is None
+
+
+class QueryCache(LRUDiskCache):
+    """
+    Size-bounded, least-recently-used on-disk cache of query results.
+
+    Results are stored as one Parquet file per key under `root`. A key
+    combines the normalized SQL with the last-modified time of every table
+    the query reads (see `key`), so a result is reused until one of its
+    source tables changes. Recency is tracked through the file mtime, which
+    makes the cache safe to share between processes (notebooks, training
+    jobs) pointing at the same root.
+
+    Args:
+        root: Directory holding the cached results. Created if missing.
+        max_bytes: Byte budget. Least recently used results are evicted once
+            the cache grows beyond it.
+    """
+
+    label = "query cache"
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(root, max_bytes)
+
+    @classmethod
+    def from_env(cls) -> Optional["QueryCache"]:
+        """
+        Return the cache rooted at `BIGQUERY_CACHE_DIR`, or None if unset.
+
+        The budget is read from `BIGQUERY_CACHE_MAX_BYTES`.
+        """
+        return cls._from_env("BIGQUERY_CACHE_DIR", "BIGQUERY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+
+    @staticmethod
+    def key(sql: str, table_versions: Dict[str, str], project: Optional[str] = None) -> str:
+        """
+        Return the cache key of a query.
+
+        Args:
+            sql: The query text.
+            table_versions: Last-modified time of every referenced table,
+                keyed by fully qualified table name.
+            project: Project the query runs in (unqualified names resolve
+                against it).
+
+        Returns:
+            str: A hex digest.
+        """
+        payload = json.dumps(
+            {
+                "sql": normalize_sql(sql),
+                "tables": sorted(table_versions.items()),
+                "project": project,
+            }
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}{_SUFFIX}"
+
+    def get(self, key: str) -> Optional[pa.Table]:
+        """
+        Return a cached result, or None on a cache miss.
+
+        A hit marks the entry as most recently used.
+        """
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+        except (FileNotFoundError, OSError, pa.ArrowInvalid):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return table
+
+    def put(self, key: str, table: pa.Table) -> None:
+        """Store a result, then evict old entries to stay within budget."""
+        fd, staging = tempfile.mkstemp(dir=self.root, prefix=".", suffix=".inprogress")
+        os.close(fd)
+        try:
+            pq.write_table(table, staging, compression="zstd")
+            os.replace(staging, self._path(key))
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+        self.evict(keep=key)
+
+    def clear(self) -> int:
+        """Delete every cached result and return how many were removed."""
+        removed = 0
+        for path, _, _ in self._entries():
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _remove(self, path: Path) -> None:
+        path.unlink()
+
+    def _entries(self) -> List[tuple]:
+        entries = []
+        for path in self.root.glob(f"*{_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Evicted concurrently by another process.
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
@@ -0,0 +1,57 @@
+"""Tests of KeyDeduplicator against pandas' drop_duplicates."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl.utils import TEMPO_KEY, KeyDeduplicator
+
+
+def frame(n=5_000, seed=0):
+    """Rows with many repeated keys, spread over a few hours."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "time": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 4, n), unit="h"),
+            "latitude": rng.integers(0, 10, n) * 0.02 + 30.0,
+            "longitude": rng.integers(0, 10, n) * 0.02 - 120.0,
+            "value": rng.normal(size=n),
+        }
+    )
+
+
+@pytest.mark.parametrize("chunk", [3, 37, 500, 5_000])
+def test_matches_drop_duplicates_across_chunks(chunk):
+    df = frame()
+    dedup = KeyDeduplicator(TEMPO_KEY)
+    out = pd.concat(
+        [dedup(df.iloc[start : start + chunk]) for start in range(0, len(df), chunk)]
+    )
+    expected = df.drop_duplicates(subset=list(TEMPO_KEY))
+    pd.testing.assert_frame_equal(out, expected)
+    assert dedup.rows == len(df)
+    assert dedup.removed == len(df) - len(expected)
+
+
+def test_partition_column_and_missing_keys():
+    df = frame(2_000, seed=1)
+    df.loc[::7, "time"] = pd.NaT
+    df.loc[::11, "latitude"] = np.nan
+    dedup = KeyDeduplicator(TEMPO_KEY, partition="latitude")
+    out = pd.concat([dedup(df.iloc[start : start + 250]) for start in range(0, len(df), 250)])
+    pd.testing.assert_frame_equal(out, df.drop_duplicates(subset=list(TEMPO_KEY)))
+
+
+def test_same_key_in_other_partition_is_kept():
+    dedup = KeyDeduplicator(["site", "hour"], partition="hour")
+    first = pd.DataFrame({"site": ["a", "b"], "hour": [0, 0]})
+    second = pd.DataFrame({"site": ["a", "a"], "hour": [1, 0]})
+    assert len(dedup(first)) == 2
+    pd.testing.assert_frame_equal(dedup(second), second.iloc[[0]])
+    assert dedup(first.iloc[:0]).empty
+
+
+def test_invalid_keys():
+    with pytest.raises(ValueError):
+        KeyDeduplicator([])
+    with pytest.raises(ValueError):
+        KeyDeduplicator(["time"], partition="latitude")
@@ -0,0 +1,68 @@
+"""Tests of the point-in-polygon helpers against matplotlib's implementation."""
+import numpy as np
+import pytest
+
+from src.services.geometry import GridMaskCache, points_in_polygon, polygon_bbox
+
+Path = pytest.importorskip("matplotlib.path").Path
+
+POLYGONS = {
+    "square": [(-120.0, 30.0), (-110.0, 30.0), (-110.0, 40.0), (-120.0, 40.0)],
+    "concave": [
+        (-120.0, 30.0), (-110.0, 30.0), (-110.0, 40.0), (-115.0, 33.0), (-120.0, 40.0),
+    ],
+    "closed": [(-118.0, 31.0), (-111.0, 32.0), (-113.0, 39.0), (-118.0, 31.0)],
+    "spiky": [
+        (-120.0, 35.0), (-115.0, 30.0), (-116.0, 35.0), (-110.0, 36.0),
+        (-116.0, 37.0), (-115.0, 40.0),
+    ],
+}
+
+
+def random_points(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-125.0, -105.0, n), rng.uniform(25.0, 45.0, n)
+
+
+@pytest.mark.parametrize("name", sorted(POLYGONS))
+def test_matches_matplotlib(name):
+    polygon = POLYGONS[name]
+    lon, lat = random_points()
+    expected = Path(polygon).contains_points(np.column_stack([lon, lat]))
+    assert expected.any() and not expected.all()
+    np.testing.assert_array_equal(points_in_polygon(lon, lat, polygon), expected)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 7, 4096])
+def test_chunking_does_not_change_the_result(chunk_size):
+    polygon = POLYGONS["concave"]
+    lon, lat = random_points(5_000, seed=1)
+    np.testing.assert_array_equal(
+        points_in_polygon(lon, lat, polygon, chunk_size=chunk_size),
+        points_in_polygon(lon, lat, polygon),
+    )
+
+
+def test_shape_and_degenerate_inputs():
+    lon, lat = random_points(600, seed=2)
+    mask = points_in_polygon(lon.reshape(20, 30), lat.reshape(20, 30), POLYGONS["square"])
+    assert mask.shape == (20, 30)
+    assert not points_in_polygon(lon, lat, POLYGONS["square"][:2]).any()
+    assert points_in_polygon(np.array([]), np.array([]), POLYGONS["square"]).size == 0
+    with pytest.raises(ValueError):
+        points_in_polygon(lon, lat[:-1], POLYGONS["square"])
+    assert polygon_bbox(POLYGONS["concave"]) == (-120.0, 30.0, -110.0, 40.0)
+
+
+def test_grid_mask_cache():
+    cache = GridMaskCache(max_entries=1)
+    lat = np.linspace(25.05, 44.95, 200)
+    lon = np.linspace(-124.95, -105.05, 200)
+    polygon = POLYGONS["spiky"]
+    mask = cache.get(lat, lon, polygon)
+    lon_grid, lat_grid = np.meshgrid(lon, lat)
+    np.testing.assert_array_equal(mask, points_in_polygon(lon_grid, lat_grid, polygon))
+    assert not mask.flags.writeable
+    assert cache.get(lat.copy(), lon.copy(), polygon) is mask
+    cache.get(lat, lon, POLYGONS["square"])
+    assert cache.get(lat, lon, polygon) is not mask
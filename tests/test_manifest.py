@@ -0,0 +1,144 @@
+"""Tests of GranuleManifest checkpointing and resumed NO2 loads."""
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("earthaccess")
+pytest.importorskip("google.cloud.bigquery")
+
+from src.etl import extract_load_no2  # noqa: E402
+from src.etl.utils import DEFAULT_DTYPE_POLICY, TEMPO_KEY  # noqa: E402
+from src.services.earth_data.manifest import DECODED, LOADED, GranuleManifest  # noqa: E402
+
+
+class FakeClient:
+    """Yields one small frame per granule and fails on `fail_on`, like a crash mid-run."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.requested = []
+
+    def iter_granules(self, granules, polygon, max_workers=1, options=None, manifest=None):
+        self.requested.append(list(granules))
+        for n, granule in enumerate(granules):
+            if granule == self.fail_on:
+                raise RuntimeError(f"download of {granule} failed")
+            frame = pd.DataFrame(
+                {
+                    "time": pd.to_datetime(["2025-01-01"] * 2) + pd.Timedelta(hours=n),
+                    "latitude": [30.0, 30.1],
+                    "longitude": [-120.0, -120.0],
+                    "vertical_column_troposphere": [1.0, 2.0],
+                    "granule": [granule] * 2,
+                }
+            )
+            if manifest is not None:
+                manifest.mark(granule, DECODED)
+            yield granule, iter([frame])
+
+
+class FakeBigQuery:
+    def __init__(self):
+        self.uploads = []
+
+    def get_table(self, dataset, table_id):
+        return None
+
+    def upload_data_from_dataframe(self, df, dataset, table_id):
+        self.uploads.append(df)
+
+
+def load(client, google, granules, manifest):
+    return extract_load_no2._load_granules(
+        client,
+        google,
+        granules,
+        polygon=None,
+        max_workers=1,
+        variables=None,
+        chunks=None,
+        dtype_policy=DEFAULT_DTYPE_POLICY,
+        dedup_key=TEMPO_KEY,
+        sparse=True,
+        primary_variable=None,
+        manifest=manifest,
+        load_batch_rows=2,
+    )
+
+
+def test_rerun_resumes_after_failure(tmp_path):
+    manifest = GranuleManifest(tmp_path / "manifest.db", scope="test")
+    google = SimpleNamespace(bigquery=FakeBigQuery())
+    granules = ["g0", "g1", "g2", "g3"]
+
+    with pytest.raises(RuntimeError, match="g2"):
+        load(FakeClient(fail_on="g2"), google, granules, manifest)
+    assert manifest.summary() == {LOADED: 2}
+    assert manifest.pending(granules) == ["g2", "g3"]
+
+    client = FakeClient()
+    stats = load(client, google, granules, manifest)
+    assert client.requested == [["g2", "g3"]]
+    assert stats["skipped"] == 2
+    assert stats["decoded"] == 2
+    assert manifest.summary() == {LOADED: 4}
+    assert manifest.get("g3")["rows"] == 2
+
+    uploaded = pd.concat(google.bigquery.uploads)["granule"].astype(str)
+    assert sorted(uploaded.unique()) == granules
+    assert uploaded.value_counts().eq(2).all()
+
+    # Nothing is left to do on a third run.
+    client = FakeClient()
+    stats = load(client, google, granules, manifest)
+    assert client.requested == []
+    assert stats["skipped"] == 4
+
+
+def test_unflushed_granules_are_not_marked_loaded(tmp_path):
+    manifest = GranuleManifest(tmp_path / "manifest.db")
+    google = SimpleNamespace(bigquery=FakeBigQuery())
+
+    def fail_upload(df, dataset, table_id):
+        raise RuntimeError("load job failed")
+
+    google.bigquery.upload_data_from_dataframe = fail_upload
+    with pytest.raises(RuntimeError, match="load job failed"):
+        load(FakeClient(), google, ["g0", "g1"], manifest)
+    assert manifest.get("g0")["status"] == DECODED
+    assert manifest.pending(["g0", "g1"]) == ["g0", "g1"]
+
+
+def test_changed_checksum_is_pending_again(tmp_path):
+    manifest = GranuleManifest(tmp_path / "manifest.db")
+
+    def granule(checksum):
+        return {
+            "meta": {"native-id": "TEMPO_NO2_L3_V03_20250101T120000Z_S001.nc"},
+            "umm": {
+                "DataGranule": {
+                    "ArchiveAndDistributionInformation": [{"Checksum": {"Value": checksum}}]
+                }
+            },
+        }
+
+    manifest.mark(granule("abc"), LOADED, rows=10)
+    assert manifest.is_loaded(granule("abc"))
+    assert not manifest.is_loaded(granule("def"))
+    # Marking by id keeps the recorded checksum and row count.
+    manifest.mark("TEMPO_NO2_L3_V03_20250101T120000Z_S001.nc", LOADED)
+    assert manifest.get(granule("abc"))["checksum"] == "abc"
+    assert manifest.get(granule("abc"))["rows"] == 10
+
+
+def test_scopes_are_independent(tmp_path):
+    path = tmp_path / "manifest.db"
+    first = GranuleManifest(path, scope="a")
+    second = GranuleManifest(path, scope="b")
+    first.mark("g0", LOADED)
+    assert second.pending(["g0"]) == ["g0"]
+    assert first.clear() == 1
+    assert first.pending(["g0"]) == ["g0"]
+    with pytest.raises(ValueError):
+        first.mark("g0", "uploaded")
@@ -0,0 +1,123 @@
+"""Tests of remote granule reads against a local HTTP server."""
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+fsspec = pytest.importorskip("fsspec")
+pytest.importorskip("aiohttp")
+pytest.importorskip("h5netcdf")
+
+from src.services.earth_data import remote  # noqa: E402
+from src.services.earth_data.remote import granule_urls, open_remote_granule  # noqa: E402
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that honours single ``Range: bytes=a-b`` headers."""
+
+    ranges = []
+
+    def send_head(self):
+        header = self.headers.get("Range")
+        if not header:
+            return super().send_head()
+        path = self.translate_path(self.path)
+        f = open(path, "rb")
+        size = f.seek(0, 2)
+        start, _, end = header.removeprefix("bytes=").partition("-")
+        start, end = int(start), min(int(end) if end else size - 1, size - 1)
+        self.ranges.append((start, end))
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return _Slice(f, end - start + 1)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Slice:
+    """File object limited to `length` bytes, as `copyfile` reads to EOF."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.left = length
+
+    def read(self, n=-1):
+        n = self.left if n < 0 else min(n, self.left)
+        self.left -= n
+        return self.f.read(n)
+
+    def close(self):
+        self.f.close()
+
+
+@pytest.fixture
+def server(tmp_path):
+    RangeRequestHandler.ranges = []
+    handler = functools.partial(RangeRequestHandler, directory=str(tmp_path))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", tmp_path
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def write_granule(path):
+    """Write a small TEMPO-like file: root coordinates plus a `product` group."""
+    lat = np.linspace(30.0, 31.0, 40)
+    lon = np.linspace(-120.0, -119.0, 50)
+    root = xr.Dataset(
+        {"weight": (("latitude", "longitude"), np.ones((40, 50), "float32"))},
+        coords={"latitude": lat, "longitude": lon},
+    )
+    no2 = np.arange(40 * 50, dtype="float64").reshape(40, 50)
+    product = xr.Dataset(
+        {
+            "vertical_column_troposphere": (("latitude", "longitude"), no2),
+            "main_data_quality_flag": (("latitude", "longitude"), np.zeros((40, 50), "int16")),
+        }
+    )
+    root.to_netcdf(path, engine="h5netcdf")
+    product.to_netcdf(path, group="product", mode="a", engine="h5netcdf")
+    return no2
+
+
+def test_open_remote_granule_over_http(server):
+    base, root = server
+    expected = write_granule(root / "granule.nc")
+    url = f"{base}/granule.nc"
+    assert granule_urls(url) == [url]
+
+    ds = open_remote_granule(
+        url,
+        fs=fsspec.filesystem("http"),
+        block_size=64 * 1024,
+        variables=["product/vertical_column_troposphere"],
+    )
+    try:
+        assert list(ds.data_vars) == ["vertical_column_troposphere"]
+        np.testing.assert_array_equal(ds["vertical_column_troposphere"].values, expected)
+        np.testing.assert_allclose(ds["latitude"].values, np.linspace(30.0, 31.0, 40))
+    finally:
+        ds.close()
+    # The file was read through range requests, not a full download.
+    assert RangeRequestHandler.ranges
+
+
+def test_missing_engine_raises_up_front(monkeypatch):
+    real_find_spec = remote.importlib.util.find_spec
+
+    def find_spec(name, *args):
+        return None if name == "h5netcdf" else real_find_spec(name, *args)
+
+    monkeypatch.setattr(remote.importlib.util, "find_spec", find_spec)
+    with pytest.raises(ImportError, match="h5netcdf"):
+        open_remote_granule("http://127.0.0.1:1/granule.nc", fs=object())
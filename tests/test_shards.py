@@ -0,0 +1,110 @@
+"""Tests of date-range sharding and sharded run bookkeeping."""
+import threading
+import time
+
+import pytest
+
+from src.etl.utils import ShardResult, run_shards, split_date_range, summarize_shards
+
+
+def test_day_shards_are_clipped_to_the_window():
+    assert split_date_range("2025-01-01 15:30:00", "2025-01-03 08:00:00", "day") == [
+        ("2025-01-01 15:30:00", "2025-01-01 23:59:59"),
+        ("2025-01-02 00:00:00", "2025-01-02 23:59:59"),
+        ("2025-01-03 00:00:00", "2025-01-03 08:00:00"),
+    ]
+
+
+def test_week_shards_start_on_monday():
+    # 2025-01-01 is a Wednesday.
+    assert split_date_range("2025-01-01", "2025-01-13 00:00:00", "week") == [
+        ("2025-01-01 00:00:00", "2025-01-05 23:59:59"),
+        ("2025-01-06 00:00:00", "2025-01-12 23:59:59"),
+        ("2025-01-13 00:00:00", "2025-01-13 00:00:00"),
+    ]
+
+
+def test_hour_shards_and_single_instant_windows():
+    shards = split_date_range("2025-01-01 22:15:00", "2025-01-02 00:59:59", "hour")
+    assert shards == [
+        ("2025-01-01 22:15:00", "2025-01-01 22:59:59"),
+        ("2025-01-01 23:00:00", "2025-01-01 23:59:59"),
+        ("2025-01-02 00:00:00", "2025-01-02 00:59:59"),
+    ]
+    instant = "2025-01-01 12:00:00"
+    assert split_date_range(instant, instant, "hour") == [(instant, instant)]
+    # A window ending exactly on a boundary gets a one-second last shard.
+    assert split_date_range("2025-01-01 23:00:00", "2025-01-02 00:00:00", "day")[-1] == (
+        "2025-01-02 00:00:00",
+        "2025-01-02 00:00:00",
+    )
+
+
+def test_shards_cover_the_window_without_gaps():
+    shards = split_date_range("2024-03-09 05:00:00", "2024-03-12 17:45:00", "hour")
+    assert shards[0][0] == "2024-03-09 05:00:00"
+    assert shards[-1][1] == "2024-03-12 17:45:00"
+    for (_, end), (start, _) in zip(shards, shards[1:]):
+        assert end[-5:] == "59:59" and start[-5:] == "00:00"
+
+
+@pytest.mark.parametrize(
+    "start, end, shard",
+    [
+        ("2025-01-02", "2025-01-01", "day"),
+        ("2025-01-01", "2025-01-02", "month"),
+    ],
+)
+def test_invalid_windows(start, end, shard):
+    with pytest.raises(ValueError):
+        split_date_range(start, end, shard)
+
+
+def test_failed_shards_do_not_stop_the_others():
+    shards = split_date_range("2025-01-01", "2025-01-04 23:59:59", "day")
+
+    def load(start, end):
+        if start.startswith("2025-01-02"):
+            raise RuntimeError("quota exceeded")
+        if start.startswith("2025-01-03"):
+            raise KeyError()
+        return {"granules": 2, "extracted": 10, "ok": True, "table": "no2"}
+
+    results = run_shards(load, shards, max_parallel=3)
+    assert [(r.start_date, r.end_date) for r in results] == shards
+    assert [r.ok for r in results] == [True, False, False, True]
+    assert results[1].error == "quota exceeded"
+    assert results[2].error == "KeyError"
+
+    summary = summarize_shards(results)
+    assert summary["granules"] == 4
+    assert summary["extracted"] == 20
+    # Booleans and strings are not summed.
+    assert "ok" not in summary and "table" not in summary
+    assert summary["shards"] == 4
+    assert summary["failed"] == shards[1:3]
+    assert summary["seconds"] == sum(r.seconds for r in results)
+
+
+def test_parallelism_is_bounded():
+    shards = split_date_range("2025-01-01", "2025-01-06 23:59:59", "day")
+    lock = threading.Lock()
+    running = peak = 0
+
+    def load(start, end):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    results = run_shards(load, shards, max_parallel=2)
+    assert all(r.ok and r.stats == {} for r in results)
+    assert peak == 2
+
+
+def test_summary_of_no_shards():
+    assert summarize_shards([]) == {"shards": 0, "failed": [], "seconds": 0}
+    assert ShardResult("a", "b").ok
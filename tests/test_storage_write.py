@@ -0,0 +1,184 @@
+"""Tests of StorageWriteSink against an in-process fake of the write API."""
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+pytest.importorskip("google.cloud.bigquery_storage_v1")
+
+from google.api_core import exceptions  # noqa: E402
+from google.cloud.bigquery_storage_v1 import types  # noqa: E402
+from google.rpc import code_pb2, status_pb2  # noqa: E402
+
+from src.services.google import bigquery  # noqa: E402
+from src.services.google.bigquery import StorageWriteSink  # noqa: E402
+
+
+class FakeWriteServer:
+    """Keeps write streams in memory and enforces offsets like the API does.
+
+    `lose_response_after` drops the connection once that many requests have
+    been applied, after the rows are stored but before the client sees the
+    response, so the client has to resend them.
+    """
+
+    def __init__(self, lose_response_after=None):
+        self.streams = {}
+        self.visible = []
+        self.metadata = []
+        self.responses = []
+        self.lose_response_after = lose_response_after
+
+    def table_path(self, project, dataset, table):
+        return f"projects/{project}/datasets/{dataset}/tables/{table}"
+
+    def create_write_stream(self, parent, write_stream):
+        name = f"{parent}/streams/{len(self.streams)}"
+        self.streams[name] = {"type": write_stream.type_, "rows": [], "finalized": False}
+        return types.WriteStream(name=name, type_=write_stream.type_)
+
+    def append_rows(self, requests, metadata=()):
+        self.metadata.append(tuple(metadata))
+        return self._serve(requests, dict(metadata))
+
+    def _serve(self, requests, headers):
+        stream = schema = None
+        for request in requests:
+            if stream is None:
+                assert request.write_stream
+                assert headers["x-goog-request-params"] == f"write_stream={request.write_stream}"
+                stream = self.streams[request.write_stream]
+                schema = pa.ipc.read_schema(
+                    pa.py_buffer(request.arrow_rows.writer_schema.serialized_schema)
+                )
+            assert not stream["finalized"]
+            batch = pa.ipc.read_record_batch(
+                pa.py_buffer(request.arrow_rows.rows.serialized_record_batch), schema
+            )
+            if request.offset < len(stream["rows"]):
+                response = types.AppendRowsResponse(
+                    error=status_pb2.Status(code=code_pb2.ALREADY_EXISTS, message="exists")
+                )
+            elif request.offset > len(stream["rows"]):
+                response = types.AppendRowsResponse(
+                    error=status_pb2.Status(code=code_pb2.OUT_OF_RANGE, message="offset gap")
+                )
+            else:
+                stream["rows"].extend(batch.to_pylist())
+                if stream["type"] == types.WriteStream.Type.COMMITTED:
+                    self.visible.extend(batch.to_pylist())
+                response = types.AppendRowsResponse(
+                    append_result=types.AppendRowsResponse.AppendResult(offset=request.offset)
+                )
+            self.responses.append(response)
+            if self.lose_response_after is not None:
+                self.lose_response_after -= 1
+                if self.lose_response_after < 0:
+                    self.lose_response_after = None
+                    raise exceptions.ServiceUnavailable("connection reset")
+            yield response
+
+    def finalize_write_stream(self, name):
+        self.streams[name]["finalized"] = True
+
+    def batch_commit_write_streams(self, request):
+        for name in request.write_streams:
+            stream = self.streams[name]
+            assert stream["finalized"]
+            self.visible.extend(stream["rows"])
+        return types.BatchCommitWriteStreamsResponse()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(bigquery.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(
+        project_id="proj", client=None, _ensure_table=lambda dataset, table_id, schema: None
+    )
+
+
+def _table(start, stop):
+    ids = list(range(start, stop))
+    return pa.table({"id": ids, "value": [float(i) / 2 for i in ids]})
+
+
+def _sink(client, server, **kwargs):
+    # A small request size splits every write into several appends.
+    return StorageWriteSink(
+        client, "dataset", "table", write_client=server, max_request_bytes=64, **kwargs
+    )
+
+
+def test_pending_rows_visible_only_after_commit(client):
+    server = FakeWriteServer()
+    sink = _sink(client, server)
+    sink.write(_table(0, 20))
+    sink.write(_table(20, 30).to_batches())
+    assert server.visible == []
+
+    assert sink.commit() == 30
+    assert sink.committed
+    assert [row["id"] for row in server.visible] == list(range(30))
+    stream = sink._stream
+    assert server.metadata
+    assert all(
+        headers == (("x-goog-request-params", f"write_stream={stream}"),)
+        for headers in server.metadata
+    )
+
+
+def test_retry_after_lost_response_writes_rows_once(client):
+    server = FakeWriteServer(lose_response_after=2)
+    with _sink(client, server) as sink:
+        sink.write(_table(0, 20))
+
+    assert len(server.metadata) == 2
+    assert any(r.error.code == code_pb2.ALREADY_EXISTS for r in server.responses)
+    assert [row["id"] for row in server.visible] == list(range(20))
+    assert sink.rows == 20
+
+
+def test_gives_up_after_max_retries(client):
+    server = FakeWriteServer(lose_response_after=0)
+    sink = _sink(client, server, max_retries=0)
+    with pytest.raises(exceptions.ServiceUnavailable):
+        sink.write(_table(0, 5))
+
+
+def test_append_error_is_not_retried(client):
+    server = FakeWriteServer()
+    sink = _sink(client, server)
+    sink.write(_table(0, 5))
+    # Skip ahead of the stream's end; the server rejects the offset.
+    sink.rows = 10
+    with pytest.raises(RuntimeError, match="offset gap"):
+        sink.write(_table(5, 10))
+    assert len(server.metadata) == 2
+
+
+def test_exception_aborts_pending_stream(client):
+    server = FakeWriteServer()
+    with pytest.raises(ValueError):
+        with _sink(client, server) as sink:
+            sink.write(_table(0, 10))
+            raise ValueError("boom")
+
+    assert not sink.committed
+    assert server.streams[sink._stream]["finalized"]
+    assert server.visible == []
+    with pytest.raises(RuntimeError):
+        sink.write(_table(10, 20))
+
+
+def test_committed_mode_rows_visible_on_append(client):
+    server = FakeWriteServer()
+    sink = _sink(client, server, mode="committed")
+    sink.write(_table(0, 10))
+    assert [row["id"] for row in server.visible] == list(range(10))
+    sink.commit()
+    assert [row["id"] for row in server.visible] == list(range(10))